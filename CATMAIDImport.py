@@ -17,28 +17,93 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
-import bmesh
-import bpy
+import time
+
+# Start-up times of this add-on (see preferences)
+STARTUP = {'import_start': time.perf_counter()}
+
+import argparse
 import colorsys
+import cProfile
+import hashlib
+import importlib
+import io
 import json
-import math
+import os
+import pstats
 import re
-import requests
-import time
+import sys
+import threading
+import tracemalloc
 import urllib
 
-import numpy as np
+try:
+    import bmesh
+    import bpy
 
-from bpy.types import Panel, Operator, AddonPreferences
-from bpy.props import (FloatVectorProperty, FloatProperty, StringProperty,
-                       BoolProperty, EnumProperty, IntProperty,)
-from bpy_extras.io_utils import orientation_helper, axis_conversion
-from mathutils import Matrix
+    from bpy.app.handlers import persistent
+    from bpy.types import Panel, Operator, AddonPreferences
+    from bpy.props import (FloatVectorProperty, FloatProperty, StringProperty,
+                           BoolProperty, EnumProperty, IntProperty,)
+except ImportError:
+    # Outside of Blender: the client, search and geometry functions (incl.
+    # `prepare_skeleton`) work as usual - anything that builds objects won't
+    bmesh = bpy = None
+    Panel = Operator = AddonPreferences = object
 
-from collections import defaultdict
+    def _no_prop(*args, **kwargs):
+        return None
+
+    FloatVectorProperty = FloatProperty = StringProperty = _no_prop
+    BoolProperty = EnumProperty = IntProperty = _no_prop
+
+    def persistent(func):
+        return func
+
+from collections import Counter, OrderedDict, defaultdict, deque
 from collections.abc import  Iterable
+from contextlib import contextmanager
 from concurrent.futures import ThreadPoolExecutor
-from requests.exceptions import HTTPError
+from datetime import datetime, timezone
+from functools import partial, wraps
+from itertools import chain
+
+
+class LazyModule:
+    """Stand-in for a module that is only imported on first use.
+
+    Keeps heavy imports (numpy, requests) out of Blender's start-up for
+    sessions that never use CATMAID.
+
+    Parameters
+    ----------
+    name :      str
+                Name of the module to import.
+
+    """
+
+    def __init__(self, name):
+        self._lazy_name = name
+        self._lazy_module = None
+        self._lazy_load_time = None
+
+    def __getattr__(self, attr):
+        # Only called for attributes not found on the proxy itself
+        if self._lazy_module is None:
+            start = time.perf_counter()
+            self._lazy_module = importlib.import_module(self._lazy_name)
+            self._lazy_load_time = time.perf_counter() - start
+        # Forward to the module (instead of copying its namespace) so that
+        # submodules it loads lazily itself (e.g. `numpy.random`) work
+        return getattr(self._lazy_module, attr)
+
+    def __repr__(self):
+        state = 'not loaded' if self._lazy_module is None else 'loaded'
+        return f'<lazy module "{self._lazy_name}" ({state})>'
+
+
+np = LazyModule('numpy')
+requests = LazyModule('requests')
 
 
 ########################################
@@ -61,9 +126,27 @@ bl_info = {
 
 client = None
 
+# Local index of neuron names (see NeuronIndex) - only used if enabled in
+# the preferences
+neuron_index = None
+
 # Will populate this later
 catmaid_volumes = [('None', 'None', 'Do not import volume from this list')]
 
+# Skeleton ID -> objects index (see get_skid_index). `objects` are the names
+# of all objects the index has seen
+SKID_INDEX = {'index': {}, 'objects': set(), 'stale': True}
+
+# Timing spans of the last import (see timing_span)
+TIMINGS = {'active': False, 'label': '', 'total': 0, 'track_memory': False,
+           'stages': {}, 'neurons': {}, 'neuron_memory': {},
+           'lock': threading.Lock()}
+# Per-thread stack of open timing spans (for memory tracking)
+_SPANS = threading.local()
+
+# Number of neurons downloaded at a time in low memory mode
+LOW_MEMORY_BATCH_SIZE = 50
+
 DEFAULTS = {
  "connectors": {
                 0: {'color': (0, 0.8, 0.8, 1),  # postsynapses
@@ -104,6 +187,16 @@ class CATMAID_PT_import_panel(Panel):
         row.alignment = 'EXPAND'
         row.operator("fetch.neuron", text="Import Neuron(s)", icon='ARMATURE_DATA')
 
+        if neuron_index is not None:
+            row = layout.row(align=True)
+            row.alignment = 'EXPAND'
+            if neuron_index.refreshing:
+                row.label(text='Refreshing neuron index...', icon='SORTTIME')
+            else:
+                row.operator("catmaid.refresh_index",
+                             text=f"Neuron index ({len(neuron_index)})",
+                             icon='FILE_REFRESH')
+
         row = layout.row(align=True)
         row.alignment = 'EXPAND'
         row.operator("fetch.connectors", text="Import Connectors", icon='PMARKER_SEL')
@@ -171,6 +264,68 @@ class CATMAID_PT_properties_panel(Panel):
         row.operator("color.by_strahler", text="Color by Strahler Index", icon='MOD_ARRAY')
         row.operator("display.help", text="", icon='QUESTION').entry = 'color.by_strahler'
 
+
+class CATMAID_PT_timings_panel(Panel):
+    """Shows time spent per stage during the last import."""
+
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_label = "Import Timings"
+    bl_category = "CATMAID"
+    bl_options = {'DEFAULT_CLOSED'}
+
+    def draw(self, context):
+        layout = self.layout
+
+        timings = get_timings()
+        if not timings['stages']:
+            layout.label(text='Nothing imported yet')
+        else:
+            self.draw_timings(timings)
+
+        if client and client.telemetry:
+            self.draw_requests(client.get_request_stats())
+
+    def draw_timings(self, timings):
+        layout = self.layout
+        layout.label(text=f"{timings['label']}: {timings['total']:.2f}s")
+
+        col = layout.column(align=True)
+        for stage, t in sorted(timings['stages'].items(), key=lambda x: -x[1]['time']):
+            row = col.row()
+            row.label(text=stage)
+            row.label(text=f"{t['time']:.2f}s ({t['count']}x)")
+            if 'peak_memory' in t:
+                row.label(text=f"{t['peak_memory'] / 1e6:.0f} MB")
+
+        if timings['neurons']:
+            layout.label(text='Slowest neurons:')
+            col = layout.column(align=True)
+            slowest = sorted(timings['neurons'].items(),
+                             key=lambda x: -sum(x[1].values()))
+            for skid, stages in slowest[:5]:
+                row = col.row()
+                row.label(text=f'#{skid}')
+                row.label(text=f'{sum(stages.values()):.2f}s')
+
+        row = layout.row(align=True)
+        row.alignment = 'EXPAND'
+        row.operator("catmaid.dump_timings", text="Save as JSON", icon='FILE_TICK')
+
+    def draw_requests(self, stats):
+        layout = self.layout
+        layout.label(text='Requests (median/90th percentile):')
+        col = layout.column(align=True)
+        for endpoint, st in sorted(stats.items(), key=lambda x: -x[1]['count'])[:8]:
+            row = col.row()
+            row.label(text=endpoint)
+            row.label(text=f"{st['count']}x {st['p50']:.2f}/{st['p90']:.2f}s")
+
+        row = layout.row(align=True)
+        row.alignment = 'EXPAND'
+        row.operator("catmaid.export_telemetry", text="Save requests as JSON lines",
+                     icon='FILE_TICK')
+
 ########################################
 #  Operators
 ########################################
@@ -209,7 +364,7 @@ class CATMAID_OP_connect(Operator):
         self.local_http_pw = get_pref('http_pw', '')
         self.local_project_id = get_pref('project_id', 0)
         self.local_server_url = get_pref('server_url', '')
-        self.max_threads = get_pref('max_threads', 20)
+        self.max_threads = get_pref('max_requests', 20)
         return context.window_manager.invoke_props_dialog(self)
 
     def execute(self, context):
@@ -218,26 +373,99 @@ class CATMAID_OP_connect(Operator):
         print('HTTP user: %s' % self.local_http_user)
         print('Token: %s' % self.local_token)
 
-        global client
-        client = CatmaidClient(server=self.local_server_url,
-                               api_token=self.local_token,
-                               http_user=self.local_http_user,
-                               http_password=self.local_http_pw,
-                               project_id=self.local_project_id,
-                               max_threads=self.max_threads)
-
-        # Retrieve volumes, to test if connection is good:
         try:
-            volumes = client.get_volume_list()
+            connect(server=self.local_server_url,
+                    api_token=self.local_token,
+                    http_user=self.local_http_user,
+                    http_password=self.local_http_pw,
+                    project_id=self.local_project_id,
+                    max_threads=self.max_threads)
             self.report({'INFO'}, 'Connection successful')
-            print('Test call successful')
         except BaseException:
             self.report({'ERROR'}, 'Connection failed: see console')
             raise
 
-        global catmaid_volumes
-        catmaid_volumes = [('None', 'None', 'Do not import volume from list')]
-        catmaid_volumes += [(str(e[0]), e[1], str(e[2])) for e in volumes]
+        return {'FINISHED'}
+
+
+class CATMAID_OP_dump_timings(Operator):
+    """Save timings of the last import as JSON file."""
+    bl_idname = "catmaid.dump_timings"
+    bl_label = "Save import timings"
+    bl_description = "Save time spent per stage and neuron during the last import to a JSON file"
+
+    filepath: StringProperty(subtype='FILE_PATH', default='catmaid_timings.json')
+
+    @classmethod
+    def poll(cls, context):
+        return bool(get_timings()['stages'])
+
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+    def execute(self, context):
+        with open(bpy.path.abspath(self.filepath), 'w') as f:
+            json.dump(get_timings(), f, indent=2)
+
+        self.report({'INFO'}, f'Timings saved to {self.filepath}')
+        return {'FINISHED'}
+
+
+class CATMAID_OP_export_telemetry(Operator):
+    """Save telemetry of recent requests as JSON lines."""
+    bl_idname = "catmaid.export_telemetry"
+    bl_label = "Save request telemetry"
+    bl_description = ("Save endpoint, size, status and timings of recent "
+                      "requests to the CATMAID server to a JSON lines file")
+
+    filepath: StringProperty(subtype='FILE_PATH', default='catmaid_requests.jsonl')
+
+    @classmethod
+    def poll(cls, context):
+        return bool(client and client.telemetry)
+
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+    def execute(self, context):
+        n = client.export_telemetry(bpy.path.abspath(self.filepath))
+
+        self.report({'INFO'}, f'{n} requests saved to {self.filepath}')
+        return {'FINISHED'}
+
+
+class CATMAID_OP_refresh_index(Operator):
+    """Refresh local index of neuron names."""
+
+    bl_idname = "catmaid.refresh_index"
+    bl_label = 'Refresh neuron index'
+    bl_description = "Refresh local index of neuron names and sizes in the background"
+
+    full: BoolProperty(name="Full refresh", default=False,
+                       description="If False, will only add neurons that are "
+                                   "new since the last refresh. If True, "
+                                   "will also pick up renamed neurons and "
+                                   "changed node counts")
+
+    @classmethod
+    def poll(cls, context):
+        if client:
+            return True
+        return False
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+
+    def execute(self, context):
+        global neuron_index
+        if neuron_index is None or neuron_index.client is not client:
+            neuron_index = NeuronIndex(client)
+            neuron_index.load()
+
+        neuron_index.refresh_in_background(full=self.full)
+        self.report({'INFO'}, 'Refreshing neuron index in the background')
 
         return {'FINISHED'}
 
@@ -299,6 +527,12 @@ class CATMAID_OP_fetch_neuron(Operator):
                              description="If true, neuron will use node radii "
                                          "for thickness. If false, radius is "
                                          "assumed to be 70nm (for visibility)")
+    split_strahler: BoolProperty(name="Split by Strahler index", default=False,
+                                 description="If true, neurites are split into "
+                                             "one curve per Strahler index on "
+                                             "import (more curves). Otherwise "
+                                             "this happens when first coloring "
+                                             "by Strahler index")
     neuron_mat_for_connectors: BoolProperty(name="Connectors same color as neuron",
                                             default=False,
                                             description="If true, connectors "
@@ -307,6 +541,12 @@ class CATMAID_OP_fetch_neuron(Operator):
     skip_existing: BoolProperty(name="Skip existing", default=True,
                                 description="If True, will not add neurons that "
                                             "are already in the scene")
+    update_changed: BoolProperty(name="Update changed", default=False,
+                                 description="If True, neurons that are already "
+                                             "in the scene but have changed on "
+                                             "the server since they were "
+                                             "imported will be re-imported. "
+                                             "Requires 'Skip existing'")
 
     # ATTENTION:
     # using check() in an operator that uses threads, will lead to segmentation faults!
@@ -360,101 +600,42 @@ class CATMAID_OP_fetch_neuron(Operator):
 
         row = box.row(align=False)
         row.prop(self, "use_radius")
+        row.prop(self, "split_strahler")
+
+        row = box.row(align=False)
         row.prop(self, "skip_existing")
 
+        row = box.row(align=False)
+        row.prop(self, "update_changed")
+        row.enabled = self.skip_existing
+
     def invoke(self, context, event):
         return context.window_manager.invoke_props_dialog(self)
 
     def execute(self, context):
-        retrieve_by_names = []
-        if self.names:
-            retrieve_by_names = client.search_names(self.names, self.partial_match)
-
-            if not len(retrieve_by_names):
-                print('ERROR: Search name(s) not found! Import stopped')
-                self.report({'ERROR'}, 'Search tag(s) not found! Import stopped')
-                return{'FINISHED'}
-
-        retrieve_by_skids = []
-        if self.skeleton_ids:
-            retrieve_by_skids = np.array([x.strip() for x in self.skeleton_ids.split(',')])
-
-        retrieve_by_annotations = []
-        if self.annotations:
-            # In case there are commas in the annotation, we use quotation marks
-            if self.annotations.startswith('"') and self.annotations.endswith('"'):
-                annotations = [self.annotations[1:-1]]
-            else:
-                annotations = [x.strip() for x in self.annotations.split(',')]
-            retrieve_by_annotations = client.search_annotations(annotations,
-                                                                allow_partial=self.partial_match,
-                                                                intersect=self.intersect)
-
-            if not len(retrieve_by_annotations):
-                print('ERROR: No matching annotation(s) found! Import stopped')
-                self.report({'ERROR'}, 'No matching annotation(s) found! Import stopped')
-                return{'FINISHED'}
-
-        if self.intersect:
-            skeletons_to_retrieve = set.intersection(set(retrieve_by_annotations),
-                                                     set(retrieve_by_names))
-
-            if not skeletons_to_retrieve:
-                print('WARNING: No neurons left after intersection! Import stopped')
-                self.report({'ERROR'}, 'Intersection empty! Import stopped')
-                return{'FINISHED'}
-        else:
-            skeletons_to_retrieve = set.union(set(retrieve_by_annotations),
-                                              set(retrieve_by_names),
-                                              set(retrieve_by_skids))
-
-        if self.minimum_nodes > 1 and skeletons_to_retrieve:
-            print(f'Filtering {len(skeletons_to_retrieve)} neurons for size')
-            counts = client.get_node_counts(skeletons_to_retrieve)
-            skeletons_to_retrieve = [e for e in skeletons_to_retrieve if counts.get(str(e), 0) >= self.minimum_nodes]
-
-        if self.skip_existing:
-            existing_skids = {ob['skeleton_id'] for ob in bpy.data.objects if 'skeleton_id' in ob}
-            skeletons_to_retrieve = skeletons_to_retrieve - existing_skids
-
-        # Only if all other filters are empty AND a minimum node count has been
-        # provided, we will find skeletons by size
-        if not self.names and not self.annotations and not self.skeleton_ids and (self.minimum_nodes > 0):
-            skeletons_to_retrieve = set(list(client.search_size(self.minimum_nodes)))
-            if self.skip_existing:
-                existing_skids = {ob['skeleton_id'] for ob in bpy.data.objects if 'skeleton_id' in ob}
-                skeletons_to_retrieve = skeletons_to_retrieve - existing_skids
-
-        if not len(skeletons_to_retrieve):
-            raise ValueError('No skeletons matching the given criteria found!')
-
-        print(f'{len(skeletons_to_retrieve)} neurons found')
-        print('Resolving names...')
-        neuron_names = client.get_names(skeletons_to_retrieve)
-
-        print("Collecting skeleton data...")
-        start = time.time()
-        skdata = client.get_skeletons(list(skeletons_to_retrieve),
-                                      with_history=False,
-                                      with_abutting=self.import_abutting)
-
-        print(f"Importing {len(skdata)} skeletons into Blender...")
-
-        for skid in skdata:
-            # Create an object name
-            object_name = f'#{skid} - {neuron_names[str(skid)]}'
-            import_skeleton(skdata[skid],
-                            skeleton_id=str(skid),
-                            object_name=object_name,
-                            downsampling=self.downsampling,
-                            import_synapses=self.import_synapses,
-                            import_gap_junctions=self.import_gap_junctions,
-                            import_abutting=self.import_abutting,
-                            use_radii=self.use_radius,
-                            cn_as_curves=not self.cn_spheres,
-                            neuron_mat_for_connectors=self.neuron_mat_for_connectors)
-
-        print(f'Finished Import in {time.time()-start:.1f}s')
+        start_timings('Import Neuron(s)')
+        try:
+            import_neurons(skeleton_ids=split_names(self.skeleton_ids),
+                           names=split_names(self.names),
+                           annotations=split_names(self.annotations),
+                           partial_match=self.partial_match,
+                           intersect=self.intersect,
+                           minimum_nodes=self.minimum_nodes,
+                           skip_existing=self.skip_existing,
+                           update_changed=self.update_changed,
+                           downsampling=self.downsampling,
+                           import_synapses=self.import_synapses,
+                           import_gap_junctions=self.import_gap_junctions,
+                           import_abutting=self.import_abutting,
+                           use_radii=self.use_radius,
+                           cn_as_curves=not self.cn_spheres,
+                           neuron_mat_for_connectors=self.neuron_mat_for_connectors,
+                           split_strahler=self.split_strahler)
+        except NothingToImport as e:
+            print(f'ERROR: {e}')
+            self.report({'ERROR'}, str(e))
+        finally:
+            print_timings(stop_timings())
 
         return {'FINISHED'}
 
@@ -574,6 +755,7 @@ class CATMAID_OP_upload_volume(Operator):
             print("No meshes selected!")
             return{'FINISHED'}
 
+        to_upload = []
         for i, obj in enumerate(self.selected):
             if self.volume_name == '':
                 vol_name = obj.name
@@ -616,19 +798,25 @@ class CATMAID_OP_upload_volume(Operator):
             obj.data.vertices.foreach_get('co', verts)  # this fills above array
             verts = verts.reshape(len(obj.data.vertices), 3)
 
-            faces = np.empty(len(obj.data.polygons) * 3)
+            faces = np.empty(len(obj.data.polygons) * 3, dtype=np.int32)
             obj.data.polygons.foreach_get('vertices', faces)
             faces = faces.reshape(len(obj.data.polygons), 3)
 
-            resp = client.upload_volume(verts, faces,
-                                        name=vol_name, comment=self.comment)
+            to_upload.append((verts, faces, vol_name))
+
+        if not to_upload:
+            return{'FINISHED'}
+
+        # Upload all meshes in one go -> requests will run in parallel
+        responses = client.upload_volumes(to_upload, comment=self.comment)
 
+        for i, ((_, _, vol_name), resp) in enumerate(zip(to_upload, responses)):
             if 'success' in resp and resp['success'] is True:
-                print(f"{i} of {len(self.selected)}: Export of mesh '{vol_name}' "
+                print(f"{i} of {len(to_upload)}: Export of mesh '{vol_name}' "
                       "successful")
                 self.report({'INFO'}, 'Success!')
             else:
-                print(f"{i} of {len(self.selected)}: Export of mesh '{vol_name}' "
+                print(f"{i} of {len(to_upload)}: Export of mesh '{vol_name}' "
                       "failed!")
                 self.report({'ERROR'}, 'See console for details!')
                 print(resp)
@@ -809,7 +997,7 @@ class CATMAID_OP_material_change(Operator):
         if self.which_neurons == 'Selected':
             ob_list = bpy.context.selected_objects
         elif self.which_neurons == 'All':
-            ob_list = bpy.data.objects
+            ob_list = get_neuron_objects(connectors=True)
 
         filtered_ob_list = []
 
@@ -921,7 +1109,7 @@ class CATMAID_OP_curve_change(Operator):
         if self.which_neurons == 'Selected':
             ob_list = bpy.context.selected_objects
         elif self.which_neurons == 'All':
-            ob_list = bpy.data.objects
+            ob_list = get_neuron_objects(connectors=True)
 
         filtered_ob_list = []
 
@@ -978,31 +1166,34 @@ class CATMAID_OP_material_randomize(Operator):
                                    description="Set end of color range (for RGB). Keep start and end the same to use full range.",
                                    default=(1, 0.0, 0.0), min=0.0, max=1.0,
                                    subtype='COLOR')
-
+    palette: BoolProperty(name="Palette mode", default=False,
+                          description="If True, neurons will share one material "
+                                      "per color instead of having a material "
+                                      "each. Much faster for large numbers of "
+                                      "neurons")
+    palette_size: IntProperty(name="Palette size", default=12, min=1,
+                              description="Number of colors to use in palette mode")
 
     def invoke(self, context, event):
         return context.window_manager.invoke_props_dialog(self)
 
     def execute(self, context):
         if self.which_neurons == 'All':
-            to_process = bpy.data.objects
+            to_process = get_neuron_objects(connectors=True)
         elif self.which_neurons == 'Selected':
-            to_process = bpy.context.selected_objects
-
-        to_process = [o for o in to_process if 'type' in o]
-        to_process = [o for o in to_process if o['type'] == 'NEURON']
+            to_process = get_neuron_objects(connectors=True, selected_only=True)
 
-        neurons = set([o['id'] for o in to_process])
+        neurons = sorted(set([o['id'] for o in to_process]))
 
-        colors = random_colors(len(neurons),
+        colors = random_colors(self.palette_size if self.palette else len(neurons),
                                color_range=self.color_range,
                                start_rgb=self.start_color,
                                end_rgb=self.end_color,
                                alpha=1)
-        colormap = dict(zip(neurons, colors))
+        colormap = {n: colors[i % len(colors)] for i, n in enumerate(neurons)}
 
         for ob in to_process:
-            ob.active_material.diffuse_color = colormap[ob['id']]
+            set_color(ob, colormap[ob['id']], palette=self.palette)
         return {'FINISHED'}
 
 
@@ -1018,6 +1209,11 @@ class CATMAID_OP_material_spatial(Operator):
     # Fade colours by distance to cluster center
     fade_color: BoolProperty(name="Fade colors", default=True,
                              description='If true, neuron color will fade with distance from cluster center.')
+    palette: BoolProperty(name="Palette mode", default=False,
+                          description="If True, neurons will share one material "
+                                      "per color instead of having a material "
+                                      "each. Faded colors are reduced to a "
+                                      "few shades")
 
     def invoke(self, context, event):
         return context.window_manager.invoke_props_dialog(self)
@@ -1025,32 +1221,35 @@ class CATMAID_OP_material_spatial(Operator):
     def execute (self, context):
         neurons = []
         coords = []
-        for obj in bpy.data.objects:
-            if 'subtype' not in obj:
-                continue
-            if obj['subtype'] != 'SOMA':
-                continue
-            neurons.append(obj)
+        for obj in get_neuron_objects(neurites=False, somas=True):
+            neurons.append(obj['id'])
             coords.append(obj.location)
-            # Set color to black -> this means that all neurons without somata
-            # will remain black
-            obj.active_material.diffuse_color = (0, 0, 0, 1)
+
+        if not neurons:
+            self.report({'ERROR'}, 'No neurons with somas found!')
+            return{'FINISHED'}
 
         clusters, centers, dists = cluster_kmeans(coords, n_clusters=self.n_clusters)
-        max_dist = dists.max()
+        # Avoid division by zero if all somas sit on their cluster center
+        max_dist = max(dists.max(), 1e-9)
 
         colors = random_colors(self.n_clusters)
 
-        for obj, cl, d in zip(neurons, clusters, dists):
+        for skid, cl, d in zip(neurons, clusters, dists):
             c = colors[cl]
 
             if self.fade_color:
                 c = list(colorsys.rgb_to_hsv(*c[:3]))
                 c[2] = 1 - (0.5 * d / max_dist)
+                # In palette mode use only a few shades per cluster
+                if self.palette:
+                    c[2] = round(c[2] * 8) / 8
                 c = list(colorsys.hsv_to_rgb(*c))
                 c.append(1)  # add alpha
 
-            obj.active_material.diffuse_color = c
+            # Neurites and soma of this neuron
+            for obj in skeleton_id_objects(skid):
+                set_color(obj, c, palette=self.palette)
 
         return{'FINISHED'}
 
@@ -1085,6 +1284,16 @@ class CATMAID_OP_material_annotation(Operator):
                                                     "annotation(s) will not be "
                                                     "changed.",
                                         default=False)
+    refresh: BoolProperty(name="Refresh annotations",
+                          description="Annotations are cached after they have "
+                                      "been fetched once. Check this to "
+                                      "fetch them from the server again.",
+                          default=False)
+    palette: BoolProperty(name="Palette mode", default=False,
+                          description="If True, neurons will share one material "
+                                      "per color instead of having a material "
+                                      "each. Much faster for large numbers of "
+                                      "neurons")
 
     def invoke(self, context, event):
         return context.window_manager.invoke_props_dialog(self)
@@ -1098,25 +1307,21 @@ class CATMAID_OP_material_annotation(Operator):
     def execute(self, context):
         skids = get_skids()
 
-        annotations = client.get_annotations(skids)
+        annotations = client.get_annotations(skids, use_cache=not self.refresh)
 
-        include_annotations = [a.strip() for a in self.annotation.split(',')]
-        exclude_annotations = [a.strip() for a in self.exclude_annotation.split(',')]
+        include_annotations = {a.strip() for a in self.annotation.split(',')} - {''}
+        exclude_annotations = {a.strip() for a in self.exclude_annotation.split(',')} - {''}
 
         for s in skids:
             objects = skeleton_id_objects(s)
 
-            include = False
-            exclude = False
-            for an in annotations.get(s, []):
-                if an in include_annotations:
-                    include = True
-                if an in exclude_annotations:
-                    exclude = True
+            an = annotations.get(s, [])
+            include = not include_annotations.isdisjoint(an)
+            exclude = not exclude_annotations.isdisjoint(an)
             if not include or exclude:
                 if self.make_non_matched_grey:
                     for obj in objects:
-                        obj.active_material.diffuse_color = (0.4, 0.4, 0.4, 1)
+                        set_color(obj, (0.4, 0.4, 0.4, 1), palette=self.palette)
                 continue
 
             if self.variation is False:
@@ -1130,7 +1335,7 @@ class CATMAID_OP_material_annotation(Operator):
                 color = list(color) + [1]
 
             for obj in objects:
-                obj.active_material.diffuse_color = color
+                set_color(obj, color, palette=self.palette)
 
         return{'FINISHED'}
 
@@ -1138,8 +1343,8 @@ class CATMAID_OP_material_annotation(Operator):
 class CATMAID_OP_material_strahler(Operator):
     """Colors a neuron by strahler index.
 
-    This essentially just triggers a reload a reload of these neurons with
-    Strahler coloring.
+    Uses the Strahler indices stored on the neurons at import. Neurons
+    imported with older versions of this plugin are reloaded instead.
     """
 
     bl_idname = "color.by_strahler"
@@ -1165,12 +1370,6 @@ class CATMAID_OP_material_strahler(Operator):
     def invoke(self, context, event):
         return context.window_manager.invoke_props_dialog(self)
 
-    @classmethod
-    def poll(cls, context):
-        if client:
-            return True
-        return False
-
     def execute(self, context):
         # Gather skeleton IDs
         if self.which_neurons == 'All':
@@ -1183,17 +1382,42 @@ class CATMAID_OP_material_strahler(Operator):
             if 'type' in ob and 'id' in ob:
                 skids.append(ob['id'])
 
-        # Collect current colors and downsampling factors
-        downsampling = {}
+        # Collect current colors
         current_colors = {}
+        for s in skids:
+            objects = skeleton_id_objects(s, somas=False, neurites=True, connectors=False)
+            for obj in objects:
+                # If already colored by Strahler, the last material has the
+                # original color
+                mats = [m for m in obj.data.materials if m]
+                if mats:
+                    current_colors[s] = tuple(mats[-1].diffuse_color)
+
+        # Recolor using the Strahler indices stored on the objects
+        to_reload = []
+        for s in skids:
+            if not set_strahler_colors(s, color=self._get_color(s, current_colors)):
+                to_reload.append(s)
+
+        if not to_reload:
+            return {'FINISHED'}
+
+        # Neurons imported with older versions need to be reloaded
+        if not client:
+            print(f'{len(to_reload)} neurons have no Strahler indices stored '
+                  'and need to be reloaded - please connect to CATMAID first')
+            self.report({'ERROR'}, 'Connect to CATMAID to reload neurons imported with older versions')
+            return {'FINISHED'}
+
+        # Collect downsampling factors
+        downsampling = {}
         names = {}
         use_radii = {}
-        for s in skids:
+        for s in to_reload:
             objects = skeleton_id_objects(s, somas=False, neurites=True, connectors=False)
             downsampling[s] = 2
             for obj in objects:
                 downsampling[s] = obj.get('downsampling', 2)
-                current_colors[s] = tuple(obj.active_material.diffuse_color)
                 names[s] = obj.name
 
                 if any([p.radius != 1 for p in obj.data.splines[0].points]):
@@ -1201,23 +1425,16 @@ class CATMAID_OP_material_strahler(Operator):
                 else:
                     use_radii[s] = False
 
-        # Delete these neurons
-        delete_neuron_objects(skids, connectors=False)
-
-        skdata = client.get_skeletons(list(skids),
+        fetched_at = time.time()
+        skdata = client.get_skeletons(list(to_reload),
                                       with_history=False,
                                       with_abutting=False)
 
+        # Delete these neurons only now that we have their replacements
+        delete_neuron_objects(to_reload, connectors=False)
+
         for s in skdata:
-            if self.color_code == 'this_color':
-                color = current_colors[s]
-            elif self.color_code == 'grey_alpha':
-                if self.white_background:
-                    color = (0, 0, 0, 1)
-                else:
-                    color = (1, 1, 1, 1)
-            else:
-                color = (np.random.randint(0, 255, 4) / 255).tolist()
+            color = self._get_color(s, current_colors)
 
             import_skeleton(skdata[s],
                             skeleton_id=str(s),
@@ -1227,10 +1444,21 @@ class CATMAID_OP_material_strahler(Operator):
                             import_gap_junctions=False,
                             import_abutting=False,
                             color_by_strahler=color,
-                            use_radii=use_radii[s])
+                            use_radii=use_radii[s],
+                            fetched_at=fetched_at)
 
         return {'FINISHED'}
 
+    def _get_color(self, skid, current_colors):
+        """Return base color for Strahler coloring."""
+        if self.color_code == 'this_color':
+            return current_colors.get(skid, (1, 1, 1, 1))
+        elif self.color_code == 'grey_alpha':
+            if self.white_background:
+                return (0, 0, 0, 1)
+            return (1, 1, 1, 1)
+        return (np.random.randint(0, 255, 4) / 255).tolist()
+
 
 class CATMAID_OP_fetch_connectors(Operator):
     """Retrieves connectors of given neuron(s)."""
@@ -1275,18 +1503,9 @@ class CATMAID_OP_fetch_connectors(Operator):
             self.report({'ERROR'}, 'Must not exclude inputs AND outputs from import - there is nothing left.')
             return {'FINISHED'}
 
-        if self.which_neurons == 'All':
-            to_search = bpy.data.objects
-        elif self.which_neurons == 'Selected':
-            to_search = bpy.context.selected_objects
-
-        filtered_ob_list = []
-        filtered_skids = set()
-        for ob in to_search:
-            if 'type' in ob and ob['type'] == 'NEURON':
-                if 'id' in ob:
-                    filtered_skids.add(ob['id'])
-                    filtered_ob_list.append(ob)
+        filtered_ob_list = get_neuron_objects(connectors=True,
+                                              selected_only=self.which_neurons == 'Selected')
+        filtered_skids = {ob['id'] for ob in filtered_ob_list if 'id' in ob}
 
         if not filtered_skids:
             print('Error - no neurons found! Cancelled')
@@ -1295,75 +1514,63 @@ class CATMAID_OP_fetch_connectors(Operator):
 
         print(f"Retrieving connector data for {len(filtered_ob_list)} objects")
 
-        # First get the connector IDs for each neuron
-        skdata = client.get_skeletons(filtered_skids)
+        # First get the connector IDs for each neuron. Neurons imported in this
+        # session are already in the client's cache.
+        skdata = client.get_skeletons(filtered_skids, use_cache=True)
+        skdata = {s: d for s, d in skdata.items() if d and len(d) >= 2}
 
-        # Drop inputs or outputs
-        if not self.get_inputs:
-            for s in skdata:
-                if not skdata[s] or len(skdata[s]) < 2:
-                    continue
-                skdata[s][1] = [c for c in skdata[s][1] if c[2] != 1]
+        # Turn connectors into arrays:
+        # [[treenode_id, connector_id, relation, x, y, z], ...]
+        cn_tables = {s: np.array(skdata[s][1], dtype=float).reshape(-1, 6)
+                     for s in skdata}
 
-        if not self.get_outputs:
-            for s in skdata:
-                if not skdata[s] or len(skdata[s]) < 2:
-                    continue
-                skdata[s][1] = [c for c in skdata[s][1] if c[2] != 0]
+        # Drop inputs or outputs
+        for s, cn in cn_tables.items():
+            if not self.get_inputs:
+                cn = cn[cn[:, 2] != 1]
+            if not self.get_outputs:
+                cn = cn[cn[:, 2] != 0]
+            cn_tables[s] = cn
 
         if self.restr_sources or self.restr_targets:
-            all_cn_ids = []
-            for s in skdata:
-                if not skdata[s] or len(skdata[s]) < 2:
-                    continue
-                all_cn_ids += [c[1] for c in skdata[s][1]]
+            all_cn_ids = np.unique(np.concatenate([cn[:, 1] for cn in cn_tables.values()] + [[]]))
 
-            # Get connector details.
-            # Data: [[2211855,  # connector ID
-            #         {'presynaptic_to': 16,
-            #          'postsynaptic_to': [15614, 10474885],
-            #          'presynaptic_to_node': 124396,
-            #          'postsynaptic_to_node': [2211846, 32891740]}], ...]
-            cn_details = client.get_connector_details(list(set(all_cn_ids)))
+            # Get connector details (cached for the session)
+            cn_details = client.get_connector_details(all_cn_ids.astype(int))
 
-            allowed_cn_in = set()
-            if self.restr_sources and self.get_inputs:
-                source_skids = eval_skids(self.restr_sources)
-                source_skids = set([int(s) for s in source_skids])
-                for cn in cn_details:
-                    if cn[1]['presynaptic_to'] in source_skids:
-                        allowed_cn_in.add(cn[0])
+            # Connector table: one row per connector for the presynaptic
+            # partner, one row per connector + postsynaptic partner
+            cn_ids = np.array([cn[0] for cn in cn_details], dtype=float)
+            cn_pre = np.array([cn[1]['presynaptic_to'] or -1 for cn in cn_details], dtype=float)
+            n_post = [len(cn[1]['postsynaptic_to']) for cn in cn_details]
+            cn_post_ids = np.repeat(cn_ids, n_post)
+            cn_post = np.fromiter(chain.from_iterable(cn[1]['postsynaptic_to'] for cn in cn_details),
+                                  dtype=float, count=sum(n_post))
 
+            if self.restr_sources and self.get_inputs:
+                source_skids = np.array(eval_skids(self.restr_sources), dtype=float)
+                allowed_cn_in = cn_ids[np.isin(cn_pre, source_skids)]
                 print(f'{len(allowed_cn_in)} incoming connectors left after filtering')
 
-            allowed_cn_out = set()
             if self.restr_targets and self.get_outputs:
-                target_skids = set(eval_skids(self.restr_targets))
-                target_skids = set([int(s) for s in target_skids])
-                for cn in cn_details:
-                    if set(cn[1]['postsynaptic_to']) & target_skids:
-                        allowed_cn_out.add(cn[0])
-
+                target_skids = np.array(eval_skids(self.restr_targets), dtype=float)
+                allowed_cn_out = np.unique(cn_post_ids[np.isin(cn_post, target_skids)])
                 print(f'{len(allowed_cn_out)} outgoing connectors left after filtering')
 
             # Drop connectors that didn't meet the criteria
-            for s in skdata:
-                if not skdata[s] or len(skdata[s]) < 2:
-                    continue
-                cn_keep = []
-                for cn in skdata[s][1]:
-                    if cn[2] == 0:
-                        if not self.restr_targets or cn[1] in allowed_cn_out:
-                            cn_keep.append(cn)
-                    elif cn[2] == 1:
-                        if not self.restr_sources or cn[1] in allowed_cn_in:
-                            cn_keep.append(cn)
-                skdata[s][1] = cn_keep
+            for s, cn in cn_tables.items():
+                is_out = cn[:, 2] == 0
+                is_in = cn[:, 2] == 1
+                if self.restr_targets and self.get_outputs:
+                    is_out &= np.isin(cn[:, 1], allowed_cn_out)
+                if self.restr_sources and self.get_inputs:
+                    is_in &= np.isin(cn[:, 1], allowed_cn_in)
+                cn_tables[s] = cn[is_out | is_in]
 
         for s in skdata:
             # Extract nodes, connectors and tags from compact_skeleton
             nodes = np.array(skdata[s][0])
-            connectors = np.array(skdata[s][1])
+            connectors = cn_tables[s]
 
             # Extract coords
             coords = nodes[:, 3:6].astype('float32')
@@ -1406,6 +1613,33 @@ class CATMAID_OP_fetch_connectors(Operator):
 
 class CatmaidClient:
     """Class representing connection to a CATMAID project."""
+
+    # Limits for splitting long lists of IDs into multiple requests (see
+    # `fetch_chunked`). These are well below what CATMAID servers accept by
+    # default but give us a few chunks to run in parallel for large queries.
+    chunk_max_ids = 5_000
+    chunk_max_bytes = 250_000  # for POST bodies
+    chunk_max_url = 6_000  # for GET requests
+
+    # Max total number of nodes of skeletons kept in the cache (64 bytes
+    # each as arrays - see `_cache_skeleton`)
+    skeleton_cache_max_nodes = 200_000
+
+    # Number of requests to keep telemetry for (overall and per endpoint)
+    telemetry_max_records = 10_000
+    telemetry_window = 1_000
+    # Telemetry records are tuples of these fields (see `record_request`)
+    telemetry_fields = ('time', 'method', 'endpoint', 'status', 'bytes_sent',
+                        'bytes_received', 'queue_wait', 'ttfb', 'total')
+    # Upper bounds (in seconds) of the bins of the per-endpoint histograms
+    telemetry_bins = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, float('inf'))
+
+    # Settings from the preferences (see `update_settings`)
+    time_out = 20
+    slow_request_threshold = 10
+    cache_max_age = 10 * 60
+    low_memory = False
+
     def __init__(self, server, api_token, http_user=None, http_password=None,
                  project_id=1, max_threads=100):
         # Catch too many backslashes in server URL
@@ -1419,10 +1653,48 @@ class CatmaidClient:
         self.api_token = api_token
         self.max_threads = max_threads
 
+        # In-session cache: skeleton ID -> list of annotations
+        self._annotation_cache = {}
+        # In-session cache of the project's annotations (see
+        # get_annotation_catalogue)
+        self._annotation_catalogue = None
+        # In-session cache: connector ID -> partner details
+        self._connector_cache = {}
+        # In-session LRU cache: skeleton ID -> compact skeleton as arrays (see
+        # get_skeletons)
+        self._skeleton_cache = OrderedDict()
+        self._skeleton_cache_nodes = 0
+        self._cache_lock = threading.Lock()
+        # Telemetry for the most recent requests (see `record_request`)
+        self.telemetry = deque(maxlen=self.telemetry_max_records)
+        self._endpoint_durations = {}
+        self._telemetry_lock = threading.Lock()
+
         self.session = requests.Session()
 
         self.update_credentials()
 
+    def update_settings(self):
+        """Read settings from the add-on preferences.
+
+        Preferences (i.e. bpy) must only be accessed from the main thread.
+        Requests, however, are also made from worker threads (see e.g.
+        `run_concurrently`) - those use the values read here.
+        `fetch` calls this whenever it runs on the main thread; call it
+        before handing the client to other threads.
+        """
+        if threading.current_thread() is not threading.main_thread():
+            return
+        # Outside of Blender keep whatever was set on the client
+        if not bpy:
+            return
+        self.time_out = get_pref('time_out', 20)
+        self.slow_request_threshold = get_pref('slow_request_threshold', 10)
+        self.cache_max_age = get_pref('cache_max_age', 10) * 60
+        self.low_memory = get_pref('low_memory', False)
+        if self.low_memory and self._skeleton_cache:
+            self.clear_cache()
+
     def update_credentials(self):
         """Update session headers."""
         if self.http_user and self.http_password:
@@ -1446,18 +1718,22 @@ class CatmaidClient:
                 self.session.headers['X-CSRFToken'] = csrf
 
     def fetch(self, url, post=None, files=None, on_error='raise', desc='Fetching',
-              disable_pbar=False, leave_pbar=True, return_type='json'):
+              disable_pbar=False, leave_pbar=True, return_type='json',
+              headers=None):
         """Fetch data from given URL(s).
 
         Parameters
         ----------
         url :           str, list of str
                         URL or list of URLs to fetch data from.
-        post :          None | dict | list of dict
+        post :          None | dict | bytes | bytearray | list thereof
                         If provided, will send POST request. Must provide one
-                        dictionary for each url.
+                        dictionary (or pre-encoded body) for each url.
         files :         str, optional
                         Files to be sent alongside POST request.
+        headers :       dict, optional
+                        Additional headers to send with each request (e.g.
+                        the content type of pre-encoded POST bodies).
         on_error :      "raise" | "log" | "pass"
                         What to do if request returns an error code: raise
                         an exception, log the error but continue or silently
@@ -1483,23 +1759,31 @@ class CatmaidClient:
         was_single = isinstance(url, str)
         url = make_iterable(url)
         # Do not use _make_iterable here as it will turn dictionaries into keys
-        post = [post] * len(url) if isinstance(post, (type(None), dict, bool)) else post
+        post = [post] * len(url) if isinstance(post, (type(None), dict, bool, bytes, bytearray, memoryview)) else post
 
         if len(url) != len(post):
             raise ValueError('POST needs to be provided for each url.')
 
+        self.update_settings()
+        time_out = self.time_out
+        slow = self.slow_request_threshold
+
         # Generate futures
         with ThreadPoolExecutor(max_workers=self.max_threads) as executor:
             futures = []
             for u, p in zip(url, post):
                 # Generate requests
                 if not isinstance(p, type(None)):
-                    f = executor.submit(self.session.post, u, data=p,
+                    f = executor.submit(self._request, 'post', u, time.time(), slow,
+                                        data=p,
                                         files=files,
-                                        timeout=get_pref('time_out', 20))
+                                        headers=headers,
+                                        timeout=time_out)
                 else:
-                    f = executor.submit(self.session.get, u, params=None,
-                                        timeout=get_pref('time_out', 20))
+                    f = executor.submit(self._request, 'get', u, time.time(), slow,
+                                        params=None,
+                                        headers=headers,
+                                        timeout=time_out)
                 futures.append(f)
 
         # Get the responses
@@ -1535,8 +1819,8 @@ class CatmaidClient:
 
         if errors:
             if on_error == 'raise':
-                raise HTTPError('{} errors encountered: {}'.format(len(errors),
-                                                                   '\n'.join(errors)))
+                msg = '{} errors encountered: {}'.format(len(errors), '\n'.join(errors))
+                raise requests.exceptions.HTTPError(msg)
             else:
                 for e, d in zip(errors, details):
                     print(e)
@@ -1545,15 +1829,16 @@ class CatmaidClient:
         # Return requested data
         if return_type.lower() == 'json':
             parsed = []
-            for r in resp:
-                content = r.content
-                if isinstance(content, bytes):
-                    content = content.decode()
-                try:
-                    parsed.append(json.loads(content))
-                except BaseException:
-                    print('Error decoding json in response:\n{}'.format(content))
-                    raise
+            with timing_span('json decode'):
+                for r in resp:
+                    content = r.content
+                    if isinstance(content, bytes):
+                        content = content.decode()
+                    try:
+                        parsed.append(json.loads(content))
+                    except BaseException:
+                        print('Error decoding json in response:\n{}'.format(content))
+                        raise
         elif return_type.lower() == 'raw':
             parsed = [r.content for r in resp]
         else:
@@ -1561,6 +1846,194 @@ class CatmaidClient:
 
         return parsed[0] if was_single else parsed
 
+    def fetch_chunked(self, url, ids, key, post=None, method='post',
+                      merge=True, max_ids=None, max_bytes=None, **kwargs):
+        """Fetch data for a (potentially long) list of IDs in parallel chunks.
+
+        IDs are encoded as ``{key}[0]=id1&{key}[1]=id2&...`` and split into
+        chunks based on the size of the encoded payload. All chunks are then
+        fetched in parallel.
+
+        Parameters
+        ----------
+        url :       str
+                    URL to fetch (without GET parameters).
+        ids :       iterable
+                    IDs to split into chunks.
+        key :       str
+                    Name of the field to encode IDs under, e.g.
+                    "skeleton_ids".
+        post :      dict, optional
+                    Additional parameters to send with each chunk.
+        method :    "post" | "get"
+                    Whether to send IDs as POST data or encode them in the URL.
+        merge :     bool
+                    If True, will merge responses: dicts are combined, lists
+                    are concatenated. If False, will return list of
+                    responses (one per chunk).
+        max_ids :   int, optional
+                    Max number of IDs per chunk. Defaults to
+                    ``chunk_max_ids``.
+        max_bytes : int, optional
+                    Max size of the encoded IDs per chunk. Defaults to
+                    ``chunk_max_bytes`` for POST and ``chunk_max_url`` for
+                    GET requests.
+        **kwargs
+                    Passed to ``fetch``.
+
+        """
+        assert method in ('post', 'get')
+
+        ids = make_iterable(ids, force_type=str).tolist()
+        post = post if post else {}
+        max_ids = max_ids if max_ids else self.chunk_max_ids
+        if not max_bytes:
+            max_bytes = self.chunk_max_bytes if method == 'post' else self.chunk_max_url
+
+        # Split into chunks based on encoded size: "{key}%5B{i}%5D={id}&"
+        chunks = []
+        this_chunk = []
+        size = 0
+        for x in ids:
+            n = len(key) + len(str(len(this_chunk))) + len(x) + 8
+            if this_chunk and (len(this_chunk) >= max_ids or size + n > max_bytes):
+                chunks.append(this_chunk)
+                this_chunk = []
+                size = 0
+            this_chunk.append(x)
+            size += n
+        if this_chunk:
+            chunks.append(this_chunk)
+
+        params = []
+        for ch in chunks:
+            p = dict(post)
+            p.update({f'{key}[{i}]': x for i, x in enumerate(ch)})
+            params.append(p)
+
+        if method == 'post':
+            responses = self.fetch([url] * len(params), post=params, **kwargs)
+        else:
+            urls = [f'{url}?{urllib.parse.urlencode(p)}' for p in params]
+            responses = self.fetch(urls, **kwargs)
+
+        if not merge:
+            return responses
+
+        if any(isinstance(r, list) for r in responses):
+            merged = []
+            for r in responses:
+                merged += r
+        else:
+            merged = {}
+            for r in responses:
+                merged.update(r)
+
+        return merged
+
+    def _request(self, method, url, submitted, slow, **kwargs):
+        """Run a single request and record its telemetry."""
+        start = time.time()
+        r = None
+        try:
+            r = self.session.request(method.upper(), url, **kwargs)
+            return r
+        finally:
+            self.record_request(method, url, r, submitted, start, slow)
+
+    def record_request(self, method, url, r, submitted, start, slow=None):
+        """Record telemetry for a request.
+
+        Parameters
+        ----------
+        method :    str
+        url :       str
+        r :         requests.Response | None
+                    None if the request failed (e.g. timed out).
+        submitted : float
+                    Time the request was queued.
+        start :     float
+                    Time the request was actually sent.
+        slow :      float, optional
+                    Requests taking longer than this (in seconds) are
+                    logged to the console.
+
+        """
+        end = time.time()
+        endpoint = urllib.parse.urlparse(url).path
+        endpoint = endpoint[len(urllib.parse.urlparse(self.server).path):]
+        endpoint = re.sub(r'(?<=/)\d+(?=/|$)', '{id}', '/' + endpoint.strip('/'))
+        # Only the endpoint (without IDs or query) is kept: records for the
+        # same endpoint share a single string
+        endpoint = sys.intern(endpoint)
+
+        status = r.status_code if r is not None else None
+        received = len(r.content) if r is not None else 0
+        # Requests measures the time until the headers were parsed
+        ttfb = r.elapsed.total_seconds() if r is not None else None
+        total = end - start
+
+        # Plain tuples (see `telemetry_fields`) are much smaller than dicts
+        self.telemetry.append((start,
+                               method.upper(),
+                               endpoint,
+                               status,
+                               len(r.request.body or b'') if r is not None else 0,
+                               received,
+                               start - submitted,
+                               ttfb,
+                               total))
+        with self._telemetry_lock:
+            if endpoint not in self._endpoint_durations:
+                self._endpoint_durations[endpoint] = deque(maxlen=self.telemetry_window)
+            self._endpoint_durations[endpoint].append(total)
+
+        if slow and total > slow:
+            print(f"Slow request ({total:.1f}s, TTFB {ttfb or 0:.1f}s, "
+                  f"queued {start - submitted:.1f}s, {received / 1e6:.1f} MB, "
+                  f"status {status}): {method.upper()} {url}")
+
+    def get_request_stats(self):
+        """Summarize telemetry per endpoint.
+
+        Returns
+        -------
+        dict
+                    Endpoint -> ``{'count', 'p50', 'p90', 'p99', 'max',
+                    'histogram'}`` over the most recent
+                    ``telemetry_window`` requests to that endpoint.
+                    ``histogram`` maps bin upper bounds (seconds) to counts.
+
+        """
+        with self._telemetry_lock:
+            durations = {k: np.array(v) for k, v in self._endpoint_durations.items()}
+
+        stats = {}
+        for endpoint, d in durations.items():
+            counts = np.bincount(np.searchsorted(self.telemetry_bins, d),
+                                 minlength=len(self.telemetry_bins))
+            p50, p90, p99 = np.percentile(d, [50, 90, 99])
+            stats[endpoint] = {'count': len(d),
+                               'p50': float(p50), 'p90': float(p90), 'p99': float(p99),
+                               'max': float(d.max()),
+                               'histogram': {str(b): int(c) for b, c in zip(self.telemetry_bins, counts)}}
+        return stats
+
+    def export_telemetry(self, filepath):
+        """Write recorded telemetry to file as JSON lines.
+
+        Returns
+        -------
+        int
+                    Number of records written.
+
+        """
+        records = list(self.telemetry)
+        with open(filepath, 'w') as f:
+            for rec in records:
+                f.write(json.dumps(dict(zip(self.telemetry_fields, rec))) + '\n')
+        return len(records)
+
     def make_url(self, *args, **GET):
         """Generate URL.
 
@@ -1644,72 +2117,164 @@ class CatmaidClient:
     def get_abutting(self, skeleton_ids):
         """Get abutting connectors for given skeleton IDs."""
         skeleton_ids = make_iterable(skeleton_ids, force_type=str)
-        get = {f'skeleton_ids[{i}]': s for i, s in enumerate(skeleton_ids)}
-        get['with_tags'] = 'false'
-        get['relation_type'] = 'abutting'
 
-        url = self.make_url(f'{self.project_id}/connectors/', **get)
-        data = self.fetch(url)['links']
+        # Chunk by number of skeletons (rather than URL length) so that
+        # large batches are split into several smaller queries that the
+        # server can answer in parallel
+        url = self.make_url(f'{self.project_id}/connectors/')
+        responses = self.fetch_chunked(url, skeleton_ids, 'skeleton_ids',
+                                       post={'with_tags': 'false',
+                                             'relation_type': 'abutting'},
+                                       method='get', merge=False, max_ids=100)
         #data format: [skeleton_id, connector_id, x, y, z, confidence, creator, treenode_id, creation_date]
 
         #Now sort to skeleton data -> give abutting connectors relation type 3 (0 = pre, 1 = post, 2 = gap)
         #and put into standard compact-skeleton format: [treenode_id, connector_id, relation_type, x, y, z]
-        abutting = {}
-        for s in skeleton_ids:
-            abutting[s] = [[e[7], e[1], 3, e[2], e[3], e[4]] for e in data if str(e[0]) == s]
+        abutting = {s: [] for s in skeleton_ids}
+        for r in responses:
+            for e in r['links']:
+                this = abutting.get(str(e[0]))
+                if this is not None:
+                    this.append([e[7], e[1], 3, e[2], e[3], e[4]])
 
         return abutting
 
-    def get_annotation_list(self):
+    def get_annotation_list(self, refresh=False):
         """Return list with annotations."""
+        return self.get_annotation_catalogue(refresh=refresh)['list']
+
+    def get_annotation_catalogue(self, refresh=False):
+        """Return cached catalogue of all annotations in the project.
+
+        The catalogue is downloaded once and re-used until it is older than
+        the "Cache lifetime" set in the preferences or ``refresh=True``.
+
+        Returns
+        -------
+        dict
+                    ``list``: list of annotations as returned by the server
+                    ``by_name``: dict mapping names to annotations
+                    ``lower``: all lower-case names joined by newlines
+                    ``offsets``: start of each name in ``lower``
+
+        """
+        cat = self._annotation_catalogue
+        if not refresh and cat and (time.time() - cat['time']) < self.cache_max_age:
+            return cat
+
         url = self.make_url(f"{self.project_id}/annotations/")
-        return self.fetch(url)['annotations']
+        annotations = self.fetch(url)['annotations']
+
+        # Index for fast partial matching: searching a single joined string
+        # is much faster than testing each name separately
+        lower = [a['name'].lower().replace('\n', ' ') for a in annotations]
+        lengths = np.array([len(n) + 1 for n in lower], dtype=int)
+        offsets = np.cumsum(lengths) - lengths
+
+        self._annotation_catalogue = {'list': annotations,
+                                      'by_name': {a['name']: a for a in annotations},
+                                      'lower': '\n'.join(lower),
+                                      'offsets': offsets,
+                                      'time': time.time()}
+        return self._annotation_catalogue
+
+    def match_annotations(self, annotations, allow_partial=False, refresh=False):
+        """Find annotations in the project matching given name(s).
+
+        Parameters
+        ----------
+        annotations :   str | list of str
+        allow_partial : bool
+                        If True, will match annotations that contain any of
+                        the given names (case-insensitive).
+        refresh :       bool
+                        If True, will re-download the list of annotations.
+
+        Returns
+        -------
+        list
+                    Matching annotations as ``{'id': ..., 'name': ...}``.
+
+        """
+        annotations = make_iterable(annotations, force_type=str)
+        cat = self.get_annotation_catalogue(refresh=refresh)
+
+        if not allow_partial:
+            return [cat['by_name'][a] for a in set(annotations) if a in cat['by_name']]
+
+        ix = set()
+        for a in annotations:
+            pos = [m.start() for m in re.finditer(re.escape(a.lower()), cat['lower'])]
+            if pos:
+                ix.update(np.searchsorted(cat['offsets'], pos, side='right') - 1)
 
-    def get_annotations(self, skeleton_ids):
-        """Return dictionary with annotations for given skeleton IDs."""
+        return [cat['list'][i] for i in sorted(ix)]
+
+    def get_annotations(self, skeleton_ids, use_cache=True):
+        """Return dictionary with annotations for given skeleton IDs.
+
+        Annotations are cached for the session: only skeletons we haven't
+        seen before are fetched (in parallel chunks). Use ``use_cache=False``
+        to re-fetch annotations for all given skeletons.
+        """
         skeleton_ids = make_iterable(skeleton_ids, force_type=str)
 
-        url = self.make_url(f'{self.project_id}/skeleton/annotationlist')
+        if use_cache:
+            missing = [s for s in skeleton_ids if s not in self._annotation_cache]
+        else:
+            missing = list(skeleton_ids)
 
-        post = {'metaannotations': 0, 'neuronnames': 0}
-        post.update({f'skeleton_ids[{i}]': s for i, s in enumerate(skeleton_ids)})
+        if missing:
+            url = self.make_url(f'{self.project_id}/skeleton/annotationlist')
+            responses = self.fetch_chunked(url, missing, 'skeleton_ids',
+                                           post={'metaannotations': 0,
+                                                 'neuronnames': 0},
+                                           merge=False)
 
-        response = self.fetch(url, post=post)
+            # Skeletons without annotations are not part of the response
+            for skid in missing:
+                self._annotation_cache[skid] = []
 
-        annotations = {}
-        for skid in response['skeletons']:
-            annotations[skid] = []
-            # for entry in annotation_list_temp['skeletons'][skid]:
-            for entry in response['skeletons'][skid]['annotations']:
-                annotation_id = entry['id']
-                annotations[skid].append(
-                    response['annotations'][str(annotation_id)])
+            for response in responses:
+                for skid, entry in response['skeletons'].items():
+                    self._annotation_cache[skid] = [response['annotations'][str(an['id'])]
+                                                    for an in entry['annotations']]
 
-        return annotations
+        return {s: self._annotation_cache[s] for s in skeleton_ids}
 
-    def get_connector_details(self, connector_ids):
-        """Return details for given connectors."""
-        connector_ids = make_iterable(connector_ids, force_type=str)
-        connector_ids = list(set(connector_ids))
+    def get_connector_details(self, connector_ids, use_cache=True):
+        """Return details for given connectors.
 
-        url = self.make_url(f'{self.project_id}/connector/skeletons')
+        Details are cached for the session: only connectors we haven't seen
+        before are fetched (in parallel chunks). Use ``use_cache=False`` to
+        re-fetch details for all given connectors.
+        """
+        connector_ids = make_iterable(connector_ids, force_type=int)
+        connector_ids = list(set(connector_ids.tolist()))
 
-        CHUNK_SIZE = min(50000, len(connector_ids))
+        if not connector_ids:
+            return []
 
-        connectors = []
-        for ch in range(0, len(connector_ids), CHUNK_SIZE):
-            post = {}
-            for i, s in enumerate(connector_ids[ch:ch + CHUNK_SIZE]):
-                post[f'connector_ids[{i}]'] = s
+        if use_cache:
+            missing = [c for c in connector_ids if c not in self._connector_cache]
+        else:
+            missing = connector_ids
 
-            connectors += self.fetch(url, post=post)
+        if missing:
+            url = self.make_url(f'{self.project_id}/connector/skeletons')
+            connectors = self.fetch_chunked(url, [str(c) for c in missing],
+                                            'connector_ids')
+            for cn_id, details in connectors:
+                self._connector_cache[int(cn_id)] = details
 
         # Data: [[2211855,  # connector ID
         #         {'presynaptic_to': 16,
         #          'postsynaptic_to': [15614, 10474885],
         #          'presynaptic_to_node': 124396,
         #          'postsynaptic_to_node': [2211846, 32891740]}], ...]
-        return connectors
+        # Connectors that don't exist (anymore) are not part of the response
+        return [[c, self._connector_cache[c]] for c in connector_ids
+                if c in self._connector_cache]
 
     def get_user_list(self):
         """Fetch list of CATMAID users."""
@@ -1720,38 +2285,139 @@ class CatmaidClient:
         """Fetch names for given skeleton IDs."""
         skeleton_ids = make_iterable(skeleton_ids, force_type=str)
         url = self.make_url(f"{self.project_id}/skeleton/neuronnames")
-        post = {f'skids[{i}]': s for i, s in enumerate(skeleton_ids)}
-        post['self.project_id'] = self.project_id
-        return self.fetch(url, post=post)
+        return self.fetch_chunked(url, skeleton_ids, 'skids')
 
     def get_node_counts(self, skeleton_ids):
         """Fetch node counts for given skeleton IDs."""
         skeleton_ids = make_iterable(skeleton_ids, force_type=str)
         url = self.make_url(f"{self.project_id}/skeletons/review-status")
-        post = {f'skeleton_ids[{i}]': s for i, s in enumerate(skeleton_ids)}
-        review_status = self.fetch(url, post=post)
+        review_status = self.fetch_chunked(url, skeleton_ids, 'skeleton_ids')
 
         return {k: v[0] for k, v in review_status.items()}
 
-    def get_skeletons(self, skeleton_ids, with_history=False, with_abutting=False):
-        """Fetch skeletons for given IDs."""
+    def get_skeleton_summaries(self, skeleton_ids):
+        """Fetch node count and time of last edit for given skeleton IDs.
+
+        Uses CATMAID's skeleton summary table which is kept up-to-date by the
+        server, i.e. this is one small row per skeleton regardless of its size.
+
+        Returns
+        -------
+        dict
+                    ``{skeleton_id: (node count, last edition as POSIX
+                    timestamp)}``
+
+        """
+        skeleton_ids = make_iterable(skeleton_ids, force_type=str)
+        url = self.make_url(f"{self.project_id}/skeletons/summary")
+        summaries = self.fetch_chunked(url, skeleton_ids, 'skeleton_ids')
+
+        return {str(e['skeleton_id']): (e['num_nodes'], to_timestamp(e['last_edition_time']))
+                for e in summaries}
+
+    def get_skeletons(self, skeleton_ids, with_history=False, with_abutting=False,
+                      use_cache=False):
+        """Fetch skeletons for given IDs.
+
+        Skeletons (without history) are kept in a least-recently-used
+        cache of up to `skeleton_cache_max_nodes` nodes in total (nothing in
+        low memory mode). With ``use_cache=True`` only skeletons not in the
+        cache are fetched from the server. Skeletons from the cache have
+        nodes and connectors as read-only float arrays (root nodes have
+        parent -1) instead of lists. Use `clear_cache` (or reconnect) to free
+        the memory.
+        """
         skeleton_ids = make_iterable(skeleton_ids, force_type=str)
+
+        cached = {}
+        if use_cache and not with_history and not self.low_memory:
+            with self._cache_lock:
+                for s in skeleton_ids:
+                    if s in self._skeleton_cache:
+                        self._skeleton_cache.move_to_end(s)
+                        cached[s] = self._skeleton_cache[s]
+            missing = [s for s in skeleton_ids if s not in cached]
+        else:
+            missing = skeleton_ids
+
         urls = [self.make_url(f'{self.project_id}/skeletons/{skid}/compact-detail',
                               with_tags='true',
                               with_connectors='true',
                               with_merge_history='false',
-                              with_history=str(with_history).lower()) for skid in skeleton_ids]
-        responses = self.fetch(urls, on_error='log')
-        print(f'Data for {len(responses)} neurons retrieved')
-        skdata = {s: r for s, r in zip(skeleton_ids, responses)}
+                              with_history=str(with_history).lower()) for skid in missing]
+        # Fetch abutting connectors alongside the skeletons
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            if with_abutting:
+                abutting = executor.submit(self.get_abutting, skeleton_ids)
+            responses = self.fetch(urls, on_error='log') if urls else []
+        print(f'Data for {len(responses)} neurons retrieved '
+              f'({len(skeleton_ids) - len(missing)} from cache)')
+
+        fetched = dict(zip(missing, responses))
+        if with_history:
+            skdata = fetched
+        else:
+            # Don't cache errors (or anything in low memory mode)
+            if not self.low_memory:
+                for s, r in fetched.items():
+                    if isinstance(r, list):
+                        self._cache_skeleton(s, r)
+            skdata = {}
+            for s in skeleton_ids:
+                if s in fetched:
+                    skdata[s] = fetched.pop(s)
+                elif s in cached:
+                    nodes, connectors, tags = cached[s]
+                    skdata[s] = [nodes, connectors, dict(tags)]
+                else:
+                    skdata[s] = None
 
         if with_abutting:
-            abutting = self.get_abutting(skeleton_ids)
+            abutting = abutting.result()
             for s in skdata:
-                skdata[s][1] += abutting.get(s, [])
+                connectors = skdata[s][1]
+                if isinstance(connectors, np.ndarray):
+                    connectors = connectors.tolist()
+                skdata[s][1] = connectors + abutting.get(s, [])
 
         return skdata
 
+    def _cache_skeleton(self, skeleton_id, skeleton):
+        """Add skeleton to the cache, evicting the least recently used.
+
+        Nodes and connectors are stored as read-only float64 arrays which
+        take a fraction of the memory of the nested lists.
+        """
+        # Would be evicted right away
+        if len(skeleton[0]) > self.skeleton_cache_max_nodes:
+            return
+
+        nodes = np.array(skeleton[0], dtype=object).reshape(len(skeleton[0]), -1)
+        if nodes.size:
+            nodes[nodes[:, 1] == None, 1] = -1
+        nodes = nodes.astype(np.float64)
+        connectors = np.array(skeleton[1], dtype=np.float64).reshape(len(skeleton[1]), -1)
+        nodes.flags.writeable = connectors.flags.writeable = False
+        skeleton = (nodes, connectors, skeleton[2])
+
+        with self._cache_lock:
+            cache = self._skeleton_cache
+            if skeleton_id in cache:
+                self._skeleton_cache_nodes -= len(cache.pop(skeleton_id)[0])
+            cache[skeleton_id] = skeleton
+            self._skeleton_cache_nodes += len(skeleton[0])
+
+            while self._skeleton_cache_nodes > self.skeleton_cache_max_nodes and cache:
+                _, evicted = cache.popitem(last=False)
+                self._skeleton_cache_nodes -= len(evicted[0])
+
+    def clear_cache(self):
+        """Clear the in-session caches of skeletons and connector details."""
+        with self._cache_lock:
+            self._skeleton_cache.clear()
+            self._skeleton_cache_nodes = 0
+            self._connector_cache.clear()
+
     def get_volume_list(self):
         """Retrieves list of available volumes."""
         url = self.make_url(f"/{self.project_id}/volumes/")
@@ -1766,87 +2432,37 @@ class CatmaidClient:
         url = self.make_url(f"/{self.project_id}/volumes/{volume_id}")
         r = self.fetch(url)
 
-        mesh_str = r['mesh']
-        mesh_name = r['name']
-        mesh_type = re.search('<(.*?) ', mesh_str).group(1)
-
-        # Now reverse engineer the mesh
-        if mesh_type == 'IndexedTriangleSet':
-            t = re.search("index='(.*?)'", mesh_str).group(1).split(' ')
-            faces = [(int(t[i]), int(t[i + 1]), int(t[i + 2]))
-                     for i in range(0, len(t) - 2, 3)]
-
-            v = re.search("point='(.*?)'", mesh_str).group(1).split(' ')
-            vertices = [(float(v[i]), float(v[i + 1]), float(v[i + 2]))
-                        for i in range(0, len(v) - 2, 3)]
-
-        elif mesh_type == 'IndexedFaceSet':
-            # For this type, each face is indexed and an index of -1 indicates
-            # the end of this face set
-            t = re.search("coordIndex='(.*?)'", mesh_str).group(1).split(' ')
-            faces = []
-            this_face = []
-            for f in t:
-                if int(f) != -1:
-                    this_face.append(int(f))
-                else:
-                    faces.append(this_face)
-                    this_face = []
-
-            # Make sure the last face is also appended
-            faces.append(this_face)
-
-            v = re.search("point='(.*?)'", mesh_str).group(1).split(' ')
-            vertices = [(float(v[i]), float(v[i + 1]), float(v[i + 2]))
-                        for i in range(0, len(v) - 2, 3)]
-        else:
-            print(f"Unknown volume type: {mesh_type}")
-            raise TypeError(f"Unknown volume type: {mesh_type}")
-
-        # Collapse to unique vertices
-        verts, inv = np.unique(vertices, return_inverse=True, axis=0)
-        faces = np.array(faces)
-        faces_new = faces.copy()
-        for i in range(inv.shape[0]):
-            faces_new[faces == i] = inv[i]
+        verts, faces = parse_x3d_mesh(r['mesh'])
 
         # Scale vertices
         verts = apply_global_xforms(verts)
 
-        return verts, faces_new, mesh_name
+        return verts, faces, r['name']
 
-    def search_annotations(self, annotations, allow_partial=False, intersect=False):
+    def search_annotations(self, annotations, allow_partial=False,
+                           intersect=False, refresh=False):
         """Find skeleton IDs by annotation(s)."""
         annotations = make_iterable(annotations, force_type=str)
-        all_ann = self.get_annotation_list()
-
-        if not allow_partial:
-            matches = [x for x in all_ann if x['name'] in annotations]
-        else:
-            matches = [x for x in all_ann if True in [y.lower() in x['name'].lower() for y in annotations]]
+        matches = self.match_annotations(annotations,
+                                         allow_partial=allow_partial,
+                                         refresh=refresh)
 
         if not matches:
             print('Found no annotation(s) matching', annotations)
             return []
 
-        url = self.make_url(f"{self.project_id}/annotations/query-targets")
         if intersect:
-            post = {'rangey_start': 0,
-                    'range_length': 500,
-                    'with_annotations': False}
+            post = {'with_annotations': False}
             for i, m in enumerate(matches):
                 post[f'annotated_with[{i}]'] = m['id']
-            resp = self.fetch(url, post=post)['entities']
-            skids = [n['skeleton_ids'][0] for n in resp if n['type'] == 'neuron']
+            posts = [post]
         else:
-            skids = []
-            for i, m in enumerate(matches):
-                post = {'rangey_start': 0,
-                        'range_length': 500,
-                        'with_annotations': False,
-                        'annotated_with[0]': m['id']}
-                resp = self.fetch(url, post=post)['entities']
-                skids += [n['skeleton_ids'][0] for n in resp if n['type'] == 'neuron']
+            posts = [{'with_annotations': False,
+                      'annotated_with[0]': m['id']} for m in matches]
+
+        skids = []
+        for resp in self.query_targets(posts):
+            skids += [n['skeleton_ids'][0] for n in resp if n['type'] == 'neuron']
 
         skids = np.unique(skids).astype(str)
 
@@ -1856,15 +2472,14 @@ class CatmaidClient:
     def search_names(self, names, allow_partial=False):
         """Find skeleton IDs by neuron name(s)."""
         names = make_iterable(names)
-        url = self.make_url(f"{self.project_id}/annotations/query-targets")
-        matches = []
         for n in names:
             assert isinstance(n, str)
-            post = {'name': str(n.strip()),
-                    'rangey_start': 0,
-                    'range_length': 500,
-                    'with_annotations': False}
-            results = self.fetch(url, post)['entities']
+
+        posts = [{'name': str(n.strip()),
+                  'with_annotations': False} for n in names]
+
+        matches = []
+        for n, results in zip(names, self.query_targets(posts)):
             for e in results:
                 if allow_partial and e['type'] == 'neuron' and n.lower() in e['name'].lower():
                     matches += e['skeleton_ids']
@@ -1873,6 +2488,49 @@ class CatmaidClient:
 
         return np.unique(matches).astype(str)
 
+    def query_targets(self, posts, page_size=5000):
+        """Run queries against annotations/query-targets.
+
+        Pages through all results: the first page of each query is fetched
+        in parallel, followed by all remaining pages (again in parallel).
+
+        Parameters
+        ----------
+        posts :     list of dicts
+                    One query per dict.
+        page_size : int
+                    Number of results per request.
+
+        Returns
+        -------
+        list of lists
+                    One list of entities per query.
+
+        """
+        url = self.make_url(f"{self.project_id}/annotations/query-targets")
+
+        # Sort by ID to make sure pages are consistent
+        posts = [dict(p, range_start=0, range_length=page_size, sort_by='id')
+                 for p in posts]
+        first = self.fetch([url] * len(posts), post=posts)
+        results = [r['entities'] for r in first]
+
+        # Collect remaining pages
+        more_posts = []
+        query_ix = []
+        for i, (p, r) in enumerate(zip(posts, first)):
+            total = r.get('totalRecords', len(r['entities']))
+            for start in range(page_size, total, page_size):
+                more_posts.append(dict(p, range_start=start))
+                query_ix.append(i)
+
+        if more_posts:
+            more = self.fetch([url] * len(more_posts), post=more_posts)
+            for i, r in zip(query_ix, more):
+                results[i] += r['entities']
+
+        return results
+
     def search_size(self, size):
         """Find skeletons above given size."""
         url = self.make_url(f"{self.project_id}/skeletons", nodecount_gt=size - 1)
@@ -1881,210 +2539,826 @@ class CatmaidClient:
 
     def upload_volume(self, vertices, faces, name, comment):
         """Upload volume to CATMAID."""
-        vertices = np.asarray(vertices)
+        return self.upload_volumes([(vertices, faces, name)], comment=comment)[0]
 
-        # Invert global transforms
-        vertices = apply_global_xforms(vertices, inverse=True).round()
+    def upload_volumes(self, volumes, comment=''):
+        """Upload multiple volumes to CATMAID in parallel.
 
-        faces = np.asarray(faces).astype(int)
+        Parameters
+        ----------
+        volumes :   list of (vertices, faces, name) tuples
+        comment :   str
 
-        postdata = {'title': name,
-                    'type': 'trimesh',
-                    'mesh': json.dumps([vertices.tolist(), faces.tolist()]),
-                    'comment': comment
-                    }
+        Returns
+        -------
+        list
+                    One response per volume.
+
+        """
+        bodies = []
+        for vertices, faces, name in volumes:
+            # Invert global transforms
+            vertices = apply_global_xforms(np.asarray(vertices), inverse=True).round()
+            faces = np.asarray(faces).astype(int)
+
+            # Encode the mesh straight into the form body instead of going
+            # through nested lists -> this matters for meshes with millions
+            # of faces
+            mesh = chain(['['], iter_json_array(vertices), [','],
+                         iter_json_array(faces), [']'])
+            bodies.append(encode_form({'title': name,
+                                       'type': 'trimesh',
+                                       'mesh': mesh,
+                                       'comment': comment}))
 
         url = self.make_url(f"/{self.project_id}/volumes/add")
-        return self.fetch(url, postdata)
+        return self.fetch([url] * len(bodies), post=bodies,
+                          headers={'Content-Type': 'application/x-www-form-urlencoded'})
+
+class NeuronIndex:
+    """Local index of neuron names, skeleton IDs and node counts.
+
+    Lets us search neurons by name and filter by size without round-trips
+    to the server. The index is stored on disk (one file per server and
+    project) and refreshed incrementally: only skeletons that were added
+    since the last refresh are fetched.
+
+    Parameters
+    ----------
+    client :    CatmaidClient
+    filepath :  str, optional
+                Where to store the index. Defaults to a file in Blender's
+                user data directory.
+
+    """
+
+    # Serialises refreshes and writes of the index file - also across
+    # instances (e.g. a refresh still running after reconnecting)
+    _file_lock = threading.RLock()
+
+    def __init__(self, client, filepath=None):
+        self.client = client
+
+        if not filepath:
+            key = hashlib.sha1(f'{client.server}|{client.project_id}'.encode()).hexdigest()
+            filepath = os.path.join(get_cache_dir(), f'neurons_{key[:12]}.npz')
+        self.filepath = filepath
+
+        self.skids = np.zeros(0, dtype=np.int64)
+        self.node_counts = np.zeros(0, dtype=np.int64)
+        self.names = []
+        self.updated = None
+        self._build_lookups()
+
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def __len__(self):
+        return len(self.skids)
+
+    @property
+    def ready(self):
+        """True if index has data and is not currently being refreshed."""
+        return len(self) > 0 and not self.refreshing
+
+    @property
+    def refreshing(self):
+        """True if index is currently being refreshed in the background."""
+        return bool(self._thread and self._thread.is_alive())
+
+    def _build_lookups(self):
+        """Build lookups for exact and partial matching of names."""
+        self._by_name = defaultdict(list)
+        for i, n in enumerate(self.names):
+            self._by_name[n].append(i)
+        self._counts = dict(zip(self.skids.astype(str).tolist(), self.node_counts.tolist()))
+
+        # Same approach as the annotation catalogue: search a single string
+        lower = [n.lower().replace('\n', ' ') for n in self.names]
+        lengths = np.array([len(n) + 1 for n in lower], dtype=int)
+        self._offsets = np.cumsum(lengths) - lengths
+        self._lower = '\n'.join(lower)
+
+    def load(self):
+        """Load index from disk. Returns False if there is no index yet."""
+        if not os.path.isfile(self.filepath):
+            return False
+
+        with np.load(self.filepath) as f:
+            skids = f['skids']
+            node_counts = f['node_counts']
+            names = bytes(f['names']).decode('utf-8').split('\x00')
+            updated = float(f['updated'])
+
+        if len(names) != len(skids):
+            print(f'Neuron index at {self.filepath} is corrupted - ignoring it')
+            return False
+
+        with self._lock:
+            self.skids, self.node_counts, self.names = skids, node_counts, names
+            self.updated = updated
+            self._build_lookups()
+
+        print(f'Loaded index with {len(self)} neurons from {self.filepath}')
+        return True
+
+    def save(self):
+        """Save index to disk."""
+        # Names are stored as a single null-separated UTF-8 buffer
+        names = np.frombuffer('\x00'.join(self.names).encode('utf-8'), dtype=np.uint8)
+        # Write to a temporary file first so that the index on disk is never
+        # half-written
+        with self._file_lock:
+            tmp = self.filepath + '.tmp'
+            with open(tmp, 'wb') as f:
+                np.savez_compressed(f,
+                                    skids=self.skids,
+                                    node_counts=self.node_counts,
+                                    names=names,
+                                    updated=self.updated)
+            os.replace(tmp, self.filepath)
+
+    def refresh(self, full=False):
+        """Update the index from the server.
+
+        Parameters
+        ----------
+        full :  bool
+                If False, will only fetch names and node counts for
+                skeletons that were added since the last refresh and drop
+                skeletons that no longer exist. If True, will re-fetch
+                everything (e.g. to pick up renamed neurons).
+
+        """
+        with self._file_lock:
+            self._refresh(full=full)
+
+    def _refresh(self, full=False):
+        start = time.time()
+        url = self.client.make_url(f'{self.client.project_id}/skeletons/')
+        all_skids = np.unique(np.asarray(self.client.fetch(url), dtype=np.int64))
+
+        if full:
+            keep = np.zeros(len(self.skids), dtype=bool)
+        else:
+            keep = np.isin(self.skids, all_skids)
+        new = all_skids[~np.isin(all_skids, self.skids[keep])]
+
+        names = {}
+        counts = {}
+        if len(new):
+            print(f'Fetching names and node counts for {len(new)} neurons')
+            names = self.client.get_names(new)
+            counts = self.client.get_node_counts(new)
+
+        skids = np.append(self.skids[keep], new)
+        node_counts = np.append(self.node_counts[keep],
+                                [counts.get(str(s), 0) for s in new]).astype(np.int64)
+        all_names = [n for n, k in zip(self.names, keep) if k]
+        all_names += [names.get(str(s), '') for s in new]
+
+        with self._lock:
+            self.skids, self.node_counts, self.names = skids, node_counts, all_names
+            self.updated = time.time()
+            self._build_lookups()
+
+        self.save()
+        print(f'Neuron index refreshed in {time.time() - start:.1f}s: '
+              f'{len(self)} neurons ({len(new)} new)')
+
+    def refresh_in_background(self, full=False):
+        """Refresh index in a background thread."""
+        if self.refreshing:
+            return
+
+        # The thread must not read the preferences itself
+        self.client.update_settings()
+
+        def _refresh():
+            try:
+                self.refresh(full=full)
+            except BaseException as e:
+                print(f'Failed to refresh neuron index: {e}')
+
+        self._thread = threading.Thread(target=_refresh, daemon=True)
+        self._thread.start()
+
+    def search_names(self, names, allow_partial=False):
+        """Find skeleton IDs by neuron name(s).
+
+        Same behaviour as ``CatmaidClient.search_names``.
+        """
+        names = make_iterable(names, force_type=str)
+        with self._lock:
+            ix = set()
+            for n in names:
+                if not allow_partial:
+                    ix.update(self._by_name.get(n, []))
+                    continue
+                pos = [m.start() for m in re.finditer(re.escape(n.lower()), self._lower)]
+                if pos:
+                    ix.update(np.searchsorted(self._offsets, pos, side='right') - 1)
+
+            return np.unique(self.skids[sorted(ix)]).astype(str)
+
+    def search_size(self, size):
+        """Find skeletons with at least given number of nodes."""
+        with self._lock:
+            return np.unique(self.skids[self.node_counts >= size]).astype(str)
+
+    def get_node_counts(self, skeleton_ids):
+        """Return node counts for given skeleton IDs (if in index)."""
+        skeleton_ids = make_iterable(skeleton_ids, force_type=str).tolist()
+        with self._lock:
+            return {s: self._counts[s] for s in skeleton_ids if s in self._counts}
+
 
 ########################################
 #  Utility functions
 ########################################
 
 
-def import_skeleton(compact_skeleton,
-                    skeleton_id,
-                    object_name,
-                    downsampling=None,
-                    import_synapses=False,
-                    import_gap_junctions=False,
-                    import_abutting=False,
-                    use_radii=False,
-                    color_by_strahler=False,
-                    cn_as_curves=False,
-                    neuron_mat_for_connectors=False):
-    """Import given skeleton into Blender."""
-    # Truncate object name is necessary
-    if len(object_name) >= 60:
-        object_name = object_name[:55] + '[..]'
+def connect(server, api_token=None, http_user=None, http_password=None,
+            project_id=1, max_threads=None, use_name_index=None):
+    """Connect to a CATMAID server.
 
-    # Extract nodes, connectors and tags from compact_skeleton
-    nodes = np.array(compact_skeleton[0])
-    connectors = np.array(compact_skeleton[1])
-    tags = compact_skeleton[2]
+    Sets the global client used by all operators and by `import_neurons`.
 
-    # Extract coords
-    coords = nodes[:, 3:6].astype('float32')
+    Parameters
+    ----------
+    server :            str
+                        URL of the CATMAID server.
+    api_token :         str, optional
+    http_user :         str, optional
+    http_password :     str, optional
+    project_id :        int
+    max_threads :       int, optional
+                        Max number of parallel requests. Defaults to the
+                        "Max parallel requests" preference.
+    use_name_index :    bool, optional
+                        Whether to use a local index of neuron names.
+                        Defaults to the "Local neuron index" preference.
 
-    # Apply global transforms
-    coords = apply_global_xforms(coords)
+    Returns
+    -------
+    CatmaidClient
 
-    # Get node and parent IDs
-    node_ids = nodes[:, 0].astype(int)
-    parent_ids = nodes[:, 1]
-    parent_ids[parent_ids == None] = -1
-    parent_ids = parent_ids.astype(int)
+    """
+    if max_threads is None:
+        max_threads = get_pref('max_requests', 20)
+    if use_name_index is None:
+        use_name_index = get_pref('use_name_index', False)
 
-    if color_by_strahler:
-        segments = extract_short_segments(node_ids, parent_ids)
-        SI = strahler_index(node_ids, parent_ids)
-        prepare_strahler_mats(skeleton_id,
-                              max_strahler_index=max(SI.values()),
-                              color=color_by_strahler)
+    global client
+    client = CatmaidClient(server=server,
+                           api_token=api_token,
+                           http_user=http_user,
+                           http_password=http_password,
+                           project_id=project_id,
+                           max_threads=max_threads)
+
+    # Retrieve volumes, to test if connection is good:
+    volumes = client.get_volume_list()
+    print('Test call successful')
+
+    global catmaid_volumes
+    catmaid_volumes = [('None', 'None', 'Do not import volume from list')]
+    catmaid_volumes += [(str(e[0]), e[1], str(e[2])) for e in volumes]
+
+    global neuron_index
+    neuron_index = None
+    if use_name_index:
+        neuron_index = NeuronIndex(client)
+        neuron_index.load()
+        neuron_index.refresh_in_background()
+
+    return client
+
+
+class NothingToImport(ValueError):
+    """Raised by `import_neurons` if no (new) neurons match the criteria."""
+
+
+def import_neurons(skeleton_ids=None, names=None, annotations=None,
+                   partial_match=False, intersect=False, minimum_nodes=0,
+                   skip_existing=True, update_changed=False, shard=None,
+                   downsampling=2, import_synapses=True,
+                   import_gap_junctions=False, import_abutting=False,
+                   use_radii=False, cn_as_curves=True,
+                   neuron_mat_for_connectors=False, split_strahler=False):
+    """Search for neurons and import them into the current scene.
+
+    This is what the "Import Neuron(s)" operator does, minus the dialog.
+    Requires a connection (see `connect`).
+
+    Parameters
+    ----------
+    skeleton_ids :  list, optional
+                    Skeleton IDs to import.
+    names :         list of str, optional
+                    Neuron names to search for.
+    annotations :   list of str, optional
+                    Annotations to search for.
+    partial_match : bool
+                    Allow partial (case-insensitive) matches of names and
+                    annotations.
+    intersect :     bool
+                    If True, neurons have to match all names and annotations.
+    minimum_nodes : int
+                    Ignore neurons with fewer nodes. If no other criteria are
+                    given, will import all neurons with at least this many
+                    nodes.
+    skip_existing : bool
+                    Do not import neurons that are already in the scene.
+    update_changed : bool
+                    Re-import neurons in the scene that have changed on the
+                    server. Requires `skip_existing`.
+    shard :         (i, n) tuple, optional
+                    Only import the i-th of n equal parts (0-based) of the
+                    matching neurons. Use this to split an import across
+                    several machines.
+    **kwargs
+                    Remaining parameters are passed to `import_skeleton`.
+
+    Returns
+    -------
+    list
+                    Skeleton IDs of the imported neurons.
+
+    Raises
+    ------
+    NothingToImport
+                    If no neurons match the criteria or all of them are
+                    already in the scene.
+
+    """
+    if not client:
+        raise ValueError('Not connected to a CATMAID server')
+
+    # Searches and downloads run in worker threads which must not read the
+    # preferences themselves
+    client.update_settings()
+
+    # Use local index for searches if available
+    use_index = neuron_index is not None and neuron_index.ready
+    if use_index:
+        print(f'Using local index of {len(neuron_index)} neurons')
+
+    # Requests are grouped into stages: everything within a stage is
+    # independent and runs in parallel
+
+    # Stage 1: search by name and annotation
+    searches = {}
+    if names:
+        if use_index:
+            searches['names'] = partial(neuron_index.search_names, names, partial_match)
+        else:
+            searches['names'] = partial(client.search_names, names, partial_match)
+
+    if annotations:
+        searches['annotations'] = partial(client.search_annotations,
+                                          annotations,
+                                          allow_partial=partial_match,
+                                          intersect=intersect)
+
+    # Only if all other filters are empty AND a minimum node count has been
+    # provided, we will find skeletons by size
+    search_by_size = not names and not annotations and not skeleton_ids and (minimum_nodes > 0)
+    if search_by_size:
+        if use_index:
+            searches['size'] = partial(neuron_index.search_size, minimum_nodes)
+        else:
+            searches['size'] = partial(client.search_size, minimum_nodes)
+
+    with timing_span('search'):
+        found = run_concurrently(**searches)
+
+    retrieve_by_names = found.get('names', [])
+    if names and not len(retrieve_by_names):
+        raise NothingToImport('Search name(s) not found! Import stopped')
+
+    retrieve_by_skids = [str(s).strip() for s in skeleton_ids] if skeleton_ids else []
+
+    retrieve_by_annotations = found.get('annotations', [])
+    if annotations and not len(retrieve_by_annotations):
+        raise NothingToImport('No matching annotation(s) found! Import stopped')
+
+    if search_by_size:
+        skeletons_to_retrieve = set(found['size'])
+    elif intersect:
+        skeletons_to_retrieve = set.intersection(set(retrieve_by_annotations),
+                                                 set(retrieve_by_names))
+
+        if not skeletons_to_retrieve:
+            raise NothingToImport('Intersection empty! Import stopped')
     else:
-        segments = extract_long_segments(node_ids, parent_ids)
+        skeletons_to_retrieve = set.union(set(retrieve_by_annotations),
+                                          set(retrieve_by_names),
+                                          set(retrieve_by_skids))
+
+    # Stage 2: metadata (node counts) for filtering by size and summaries
+    # for updating changed neurons
+    existing_skids = set()
+    if skip_existing:
+        # Neurons that still have objects in the scene
+        index = get_skid_index()
+        existing_skids = {s for s in skeletons_to_retrieve if str(s) in index}
+
+    counts = {}
+    need_counts = set()
+    if minimum_nodes > 1 and not search_by_size:
+        need_counts |= skeletons_to_retrieve
+
+    if need_counts:
+        with timing_span('metadata'):
+            if use_index:
+                counts = neuron_index.get_node_counts(need_counts)
+            # Fetch what the index can't give us in one go
+            missing = [s for s in need_counts if str(s) not in counts]
+            if missing:
+                counts.update(client.get_node_counts(missing))
+
+    if minimum_nodes > 1 and not search_by_size and skeletons_to_retrieve:
+        print(f'Filtering {len(skeletons_to_retrieve)} neurons for size')
+        skeletons_to_retrieve = {e for e in skeletons_to_retrieve if counts.get(str(e), 0) >= minimum_nodes}
+
+    # Changed neurons are replaced only once their new data has arrived
+    changed = set()
+    if skip_existing:
+        skeletons_to_retrieve = skeletons_to_retrieve - existing_skids
+
+        if existing_skids and update_changed:
+            with timing_span('metadata'):
+                changed = get_changed_skeletons(existing_skids)
+            if changed:
+                print(f'Updating {len(changed)} neurons that changed since import')
+                skeletons_to_retrieve |= changed
+
+    if not len(skeletons_to_retrieve):
+        if existing_skids:
+            raise NothingToImport('All matching neurons are already in the '
+                                  'scene and up to date')
+        raise NothingToImport('No skeletons matching the given criteria found!')
+
+    skids = sorted({str(s) for s in skeletons_to_retrieve}, key=int)
+    if shard:
+        i, n = shard
+        skids = skids[i::n]
+        print(f'Shard {i + 1}/{n}: {len(skids)} of {len(skeletons_to_retrieve)} neurons')
+        if not skids:
+            return []
 
-    # Find soma
-    soma_node = None
-    if 'soma' in tags:
-        soma_node = tags['soma'][-1]
-
-    # Find root node
-    # -> this will be starting point for creation of the curves
-    root_node = node_ids[parent_ids < 0][0]
-
-    # Create the object
-    cu = bpy.data.curves.new(f"{object_name} curve", 'CURVE')
-    ob = bpy.data.objects.new(object_name, cu)
-    ob.location = (0, 0, 0)
-    ob.show_name = True
-    ob['type'] = 'NEURON'
-    ob['subtype'] = 'NEURITES'
-    ob['CATMAID_object'] = True
-    ob['downsampling'] = downsampling if downsampling else 0
-    ob['id'] = str(skeleton_id)
-    cu.dimensions = '3D'
-    cu.fill_mode = 'FULL'
-    cu.bevel_resolution = 5
-    cu.resolution_u = 10
-
-    if use_radii:
-        cu.bevel_depth = 1
+    print(f'{len(skids)} neurons found')
+
+    # Stage 3: names and skeletons (+ abutting connectors). In low memory
+    # mode, skeletons are downloaded and built in batches.
+    if client.low_memory:
+        batch_size = LOW_MEMORY_BATCH_SIZE
     else:
-        cu.bevel_depth = 0.015
+        batch_size = len(skids)
+
+    neuron_names = None
+    imported = []
+    for i in range(0, len(skids), batch_size):
+        batch = skids[i:i + batch_size]
+        print(f"Collecting skeleton data for {len(batch)} neurons...")
+        tasks = {'skeletons': partial(client.get_skeletons,
+                                      batch,
+                                      with_history=False,
+                                      with_abutting=import_abutting)}
+        # Names for all neurons are fetched alongside the first batch
+        if neuron_names is None:
+            tasks['names'] = partial(client.get_names, skids)
+        # Edits made after this point will be picked up by `update_changed`
+        fetched_at = time.time()
+        with timing_span('download'):
+            data = run_concurrently(**tasks)
+        neuron_names = data.get('names', neuron_names)
+        skdata = data['skeletons']
+
+        replaced = [s for s in skdata if str(s) in changed]
+        if replaced:
+            delete_neuron_objects(replaced)
 
-    # DO NOT touch this: lookup via dict is >10X faster!
-    tn_coords = {n: co for n, co in zip(node_ids, coords)}
-    radii = nodes[:, 6].astype(float) / get_pref('scale_factor', 10_000)
-    tn_radii = {n: co for n, co in zip(node_ids, radii)}
+        print(f"Importing {len(skdata)} skeletons into Blender...")
 
-    # Collect fix nodes
-    if isinstance(downsampling, int) and downsampling > 1:
-        leafs = node_ids[~np.isin(node_ids, parent_ids)]
-        fix_nodes = [root_node] + leafs.tolist()
-        _nodes, _counts = np.unique(parent_ids, return_counts=True)
-        branch_points = _nodes[_counts > 1]
-        fix_nodes += branch_points.tolist()
+        # Drop each skeleton's data as soon as it has been built
+        while skdata:
+            skid, sk = skdata.popitem()
+            # Create an object name
+            object_name = f'#{skid} - {neuron_names[str(skid)]}'
+            import_skeleton(sk,
+                            skeleton_id=str(skid),
+                            object_name=object_name,
+                            downsampling=downsampling,
+                            import_synapses=import_synapses,
+                            import_gap_junctions=import_gap_junctions,
+                            import_abutting=import_abutting,
+                            use_radii=use_radii,
+                            cn_as_curves=cn_as_curves,
+                            neuron_mat_for_connectors=neuron_mat_for_connectors,
+                            split_strahler=split_strahler,
+                            fetched_at=fetched_at)
+            imported.append(str(skid))
+            del sk
+        del data, skdata
 
-    for seg in segments:
-        if isinstance(downsampling, int) and downsampling > 1:
-            mask = np.zeros(len(seg), dtype=bool)
-            mask[downsampling::downsampling] = True
+    return imported
 
-            keep = np.isin(seg, fix_nodes)
 
-            seg = np.array(seg)[mask | keep]
+def prepare_skeleton(compact_skeleton, downsampling=None, use_radii=False,
+                     split_strahler=False, skeleton_id=None):
+    """Turn a compact-detail skeleton into arrays ready to build objects from.
 
-        sp = cu.splines.new('POLY')
+    Needs only numpy - e.g. to pre-process skeletons in worker processes.
+
+    Parameters
+    ----------
+    compact_skeleton :  list
+                        ``[nodes, connectors, tags]`` as returned by
+                        `CatmaidClient.get_skeletons`.
+    downsampling :      int, optional
+                        Keep only every n-th node within unbranched segments.
+    use_radii :         bool
+                        If True, also return a radius for each point.
+    split_strahler :    bool
+                        If True, split segments wherever the Strahler index
+                        changes (more splines). Otherwise, Strahler indices
+                        are returned per point (see `split_by_strahler`).
+    skeleton_id :       str, optional
+                        Only used to attribute timings.
+
+    Returns
+    -------
+    dict
+                        With keys:
+                          - ``node_ids``, ``parent_ids``: (N, ) int arrays
+                          - ``tn_coords``: {node ID: transformed coordinates}
+                          - ``splines``: list of ``(node_ids, coords, radii)``;
+                            radii are None unless `use_radii`
+                          - ``spline_strahler``: Strahler index per spline
+                            (empty unless `split_strahler`)
+                          - ``point_strahler``: Strahler index per point as
+                            one array per spline (empty if `split_strahler`)
+                          - ``soma``: ``(location, radius, strahler)`` or
+                            None
+                          - ``connectors``: (M, 6) array of
+                            ``[node, connector, type, x, y, z]``
+
+    """
+    with timing_span('array conversion', neuron=skeleton_id):
+        # Extract nodes, connectors and tags from compact_skeleton
+        nodes = np.array(compact_skeleton[0])
+        connectors = np.array(compact_skeleton[1])
+        tags = compact_skeleton[2]
+
+        # Extract coords
+        coords = nodes[:, 3:6].astype('float32')
+
+        # Apply global transforms
+        coords = apply_global_xforms(coords)
+
+        # Get node and parent IDs
+        node_ids = nodes[:, 0].astype(int)
+        parent_ids = nodes[:, 1]
+        parent_ids[parent_ids == None] = -1
+        parent_ids = parent_ids.astype(int)
+
+        # DO NOT touch this: lookup via dict is >10X faster!
+        tn_coords = {n: co for n, co in zip(node_ids, coords)}
+        radii = nodes[:, 6].astype(float) / get_pref('scale_factor', 10_000)
+        tn_radii = {n: co for n, co in zip(node_ids, radii)}
+
+    with timing_span('segment extraction', neuron=skeleton_id):
+        segments = extract_long_segments(node_ids, parent_ids)
 
-        coords = np.array([tn_coords[tn] for tn in seg])
+        # Strahler indices are stored on the curve such that we can later
+        # (re-)color by Strahler index without reloading the neuron. Coloring
+        # needs one spline per index - that split is optional here.
+        SI = strahler_index(node_ids, parent_ids)
+        if split_strahler:
+            segments = split_segments(segments, SI)
+
+        # Collect fix nodes
+        # -> root, leafs and branch points are never downsampled
+        downsample = isinstance(downsampling, int) and downsampling > 1
+        if downsample:
+            root_node = node_ids[parent_ids < 0][0]
+            leafs = node_ids[~np.isin(node_ids, parent_ids)]
+            _nodes, _counts = np.unique(parent_ids, return_counts=True)
+            branch_points = _nodes[_counts > 1]
+            fix_nodes = np.concatenate([[root_node], leafs, branch_points])
+
+        splines = []
+        spline_SI = []
+        point_SI = []
+        for seg in segments:
+            if split_strahler:
+                spline_SI.append(int(SI[seg[0]]))
+
+            seg = np.asarray(seg)
+            if downsample:
+                mask = np.zeros(len(seg), dtype=bool)
+                mask[downsampling::downsampling] = True
+
+                keep = np.isin(seg, fix_nodes)
+
+                seg = seg[mask | keep]
+
+            seg_coords = np.array([tn_coords[tn] for tn in seg])
+            seg_radii = [tn_radii[tn] for tn in seg] if use_radii else None
+            splines.append((seg, seg_coords, seg_radii))
+            if not split_strahler:
+                point_SI.append(np.array([SI[tn] for tn in seg], dtype=np.int32))
+
+    soma = None
+    if 'soma' in tags:
+        soma_node = tags['soma'][0]
+        soma = (tn_coords[soma_node], tn_radii[soma_node], int(SI[soma_node]))
+
+    return {'node_ids': node_ids,
+            'parent_ids': parent_ids,
+            'tn_coords': tn_coords,
+            'splines': splines,
+            'spline_strahler': spline_SI,
+            'point_strahler': point_SI,
+            'soma': soma,
+            'connectors': connectors}
 
-        # Add points
-        sp.points.add(len(coords) - 1)
 
-        # Add this weird fourth coordinate
-        coords = np.c_[coords, [0] * coords.shape[0]]
+def import_skeleton(compact_skeleton,
+                    skeleton_id,
+                    object_name,
+                    downsampling=None,
+                    import_synapses=False,
+                    import_gap_junctions=False,
+                    import_abutting=False,
+                    use_radii=False,
+                    color_by_strahler=False,
+                    cn_as_curves=False,
+                    neuron_mat_for_connectors=False,
+                    split_strahler=False,
+                    fetched_at=None):
+    """Import given skeleton into Blender.
+
+    Neurites are split by Strahler index right away if `split_strahler` is
+    True or the neuron is colored by Strahler index. `fetched_at` is the
+    time the skeleton was requested from the server (defaults to now).
+    """
+    prepared = prepare_skeleton(compact_skeleton,
+                                downsampling=downsampling,
+                                use_radii=use_radii,
+                                split_strahler=split_strahler or bool(color_by_strahler),
+                                skeleton_id=skeleton_id)
+    build_skeleton(prepared,
+                   skeleton_id,
+                   object_name,
+                   downsampling=downsampling,
+                   import_synapses=import_synapses,
+                   import_gap_junctions=import_gap_junctions,
+                   import_abutting=import_abutting,
+                   use_radii=use_radii,
+                   color_by_strahler=color_by_strahler,
+                   cn_as_curves=cn_as_curves,
+                   neuron_mat_for_connectors=neuron_mat_for_connectors,
+                   fetched_at=fetched_at)
+
+
+def build_skeleton(prepared,
+                   skeleton_id,
+                   object_name,
+                   downsampling=None,
+                   import_synapses=False,
+                   import_gap_junctions=False,
+                   import_abutting=False,
+                   use_radii=False,
+                   color_by_strahler=False,
+                   cn_as_curves=False,
+                   neuron_mat_for_connectors=False,
+                   fetched_at=None):
+    """Create Blender objects from the output of `prepare_skeleton`."""
+    # Truncate object name is necessary
+    if len(object_name) >= 60:
+        object_name = object_name[:55] + '[..]'
 
-        # Set point coordinates
-        sp.points.foreach_set('co', coords.ravel())
-        sp.points.foreach_set('weight', seg)
+    with timing_span('spline creation', neuron=skeleton_id):
+        # Create the object
+        cu = bpy.data.curves.new(f"{object_name} curve", 'CURVE')
+        ob = bpy.data.objects.new(object_name, cu)
+        ob.location = (0, 0, 0)
+        ob.show_name = True
+        ob['type'] = 'NEURON'
+        ob['subtype'] = 'NEURITES'
+        ob['CATMAID_object'] = True
+        ob['downsampling'] = downsampling if downsampling else 0
+        ob['id'] = str(skeleton_id)
+        index_object(ob)
+        cu.dimensions = '3D'
+        cu.fill_mode = 'FULL'
+        cu.bevel_resolution = 5
+        cu.resolution_u = 10
 
         if use_radii:
-            r = [tn_radii[tn] for tn in seg]
-            sp.points.foreach_set('radius', r)
-
-        if color_by_strahler:
-            # This Strahler's material name
-            mat_name = f'#{skeleton_id} StrahlerMat {SI[seg[0]]}'
-            # Grab the corresponding material
-            mat = bpy.data.materials[mat_name]
-
-            if mat_name not in ob.data.materials:
-                ob.data.materials.append(bpy.data.materials[mat_name])
-                slot = len(ob.data.materials)
-            else:
-                slot = [mat.name for mat in ob.data.materials].index(mat_name)
+            cu.bevel_depth = 1
+        else:
+            cu.bevel_depth = 0.015
 
-            # Set this material for this spline
-            sp.material_index = slot
+        for seg, coords, radii in prepared['splines']:
+            sp = cu.splines.new('POLY')
 
-    # Take care of the material
-    if not color_by_strahler:
-        mat_name = f'M#{skeleton_id}'[:59]
-        mat = bpy.data.materials.get(mat_name,
-                                     bpy.data.materials.new(mat_name))
-        ob.active_material = mat
-    elif 'soma' in tags:
-        # Select the appropriate material for use at soma
-        soma_node = tags['soma'][0]
-        mat_name = f'#{skeleton_id} StrahlerMat {SI[soma_node]}'
-        mat = bpy.data.materials[mat_name]
+            # Add points
+            sp.points.add(len(coords) - 1)
 
-    # Link curve to scene
-    bpy.context.scene.collection.objects.link(ob)
+            # Add this weird fourth coordinate
+            coords = np.c_[coords, [0] * coords.shape[0]]
+
+            # Set point coordinates
+            sp.points.foreach_set('co', coords.ravel())
+            sp.points.foreach_set('weight', seg)
+
+            if use_radii:
+                sp.points.foreach_set('radius', radii)
+
+        # Strahler index for each spline or (if not split yet) each point
+        if prepared['spline_strahler']:
+            ob['strahler'] = prepared['spline_strahler']
+        elif prepared['point_strahler']:
+            ob['point_strahler'] = np.concatenate(prepared['point_strahler']).tolist()
+
+        # Take care of the material
+        mat = None
+        if not color_by_strahler:
+            mat_name = f'M#{skeleton_id}'[:59]
+            mat = bpy.data.materials.get(mat_name) or bpy.data.materials.new(mat_name)
+            ob.active_material = mat
 
     # Take care of the soma
-    if 'soma' in tags:
-        soma_node = tags['soma'][0]
-        loc = tn_coords[soma_node]
-        rad = tn_radii[soma_node]
+    soma_ob = None
+    if prepared['soma']:
+        with timing_span('soma creation', neuron=skeleton_id):
+            loc, rad, soma_strahler = prepared['soma']
 
-        mesh = bpy.data.meshes.new(f'Soma of #{skeleton_id} - mesh')
-        soma_ob = bpy.data.objects.new(f'Soma of #{skeleton_id}', mesh)
+            mesh = bpy.data.meshes.new(f'Soma of #{skeleton_id} - mesh')
+            soma_ob = bpy.data.objects.new(f'Soma of #{skeleton_id}', mesh)
 
-        soma_ob.location = loc
+            soma_ob.location = loc
 
-        # Construct the bmesh cube and assign it to the blender mesh.
-        bm = bmesh.new()
-        try:
-            bmesh.ops.create_uvsphere(bm, u_segments=16, v_segments=8, diameter=rad)
-        except TypeError:
-            bmesh.ops.create_uvsphere(bm, u_segments=16, v_segments=8, radius=rad)
-        bm.to_mesh(mesh)
-        bm.free()
+            # Construct the bmesh cube and assign it to the blender mesh.
+            bm = bmesh.new()
+            try:
+                bmesh.ops.create_uvsphere(bm, u_segments=16, v_segments=8, diameter=rad)
+            except TypeError:
+                bmesh.ops.create_uvsphere(bm, u_segments=16, v_segments=8, radius=rad)
+            bm.to_mesh(mesh)
+            bm.free()
 
-        mesh.polygons.foreach_set('use_smooth', [True] * len(mesh.polygons))
+            mesh.polygons.foreach_set('use_smooth', [True] * len(mesh.polygons))
 
-        soma_ob.name = f'Soma of #{skeleton_id}'
-        soma_ob['type'] = 'NEURON'
-        soma_ob['subtype'] = 'SOMA'
-        soma_ob['CATMAID_object'] = True
-        soma_ob['id'] = str(skeleton_id)
+            soma_ob.name = f'Soma of #{skeleton_id}'
+            soma_ob['type'] = 'NEURON'
+            soma_ob['subtype'] = 'SOMA'
+            soma_ob['CATMAID_object'] = True
+            soma_ob['id'] = str(skeleton_id)
+            soma_ob['strahler'] = soma_strahler
+            index_object(soma_ob)
 
-        soma_ob.active_material = mat
+            if mat:
+                soma_ob.active_material = mat
 
-        # Add the object into the scene
-        bpy.context.scene.collection.objects.link(soma_ob)
+    # Add the objects into the scene
+    with timing_span('scene linking', neuron=skeleton_id):
+        bpy.context.scene.collection.objects.link(ob)
+        if soma_ob:
+            bpy.context.scene.collection.objects.link(soma_ob)
 
+    connectors = prepared['connectors']
     if len(connectors):
-        import_connectors(connectors,
-                          tn_coords,
-                          skeleton_id,
-                          color=None,
-                          as_curves=cn_as_curves,
-                          import_synapses=import_synapses,
-                          import_gap_junctions=import_gap_junctions,
-                          import_abutting=import_abutting)
+        with timing_span('connector creation', neuron=skeleton_id):
+            import_connectors(connectors,
+                              prepared['tn_coords'],
+                              skeleton_id,
+                              color=None,
+                              as_curves=cn_as_curves,
+                              import_synapses=import_synapses,
+                              import_gap_junctions=import_gap_junctions,
+                              import_abutting=import_abutting)
+
+    if color_by_strahler:
+        set_strahler_colors(skeleton_id, color=color_by_strahler)
+
+    # Keep track of what we imported and how
+    now = time.time()
+    get_skeleton_registry()[str(skeleton_id)] = {
+        'node_count': len(prepared['node_ids']),
+        'fetched_at': fetched_at if fetched_at is not None else now,
+        'imported_at': now,
+        'downsampling': ob['downsampling'],
+        'use_radii': int(use_radii),
+        'synapses': int(import_synapses),
+        'gap_junctions': int(import_gap_junctions),
+        'abutting': int(import_abutting),
+        'cn_as_curves': int(cn_as_curves),
+    }
 
 
 def import_connectors(connectors,
@@ -2198,12 +3472,12 @@ def import_connectors(connectors,
         ob['CATMAID_object'] = True
         ob['cn_type'] = t
         ob['id'] = str(skeleton_id)
+        index_object(ob)
         ob.location = (0, 0, 0)
         ob.show_name = False
 
         mat_name = f'{settings["name"]} of #{skeleton_id}'
-        mat = bpy.data.materials.get(mat_name,
-                                     bpy.data.materials.new(mat_name))
+        mat = bpy.data.materials.get(mat_name) or bpy.data.materials.new(mat_name)
 
         if not color:
             color = settings['color']
@@ -2227,9 +3501,10 @@ def extract_short_segments(node_ids, parent_ids):
     # Combine into seeds
     seeds = np.append(leafs, branch_points)
 
-    # Add root to stop condition
+    # Add root to stop condition (and its "parent" in case the root is
+    # itself a branch point)
     root = node_ids[parent_ids < 0]
-    stops = set(np.append(seeds, root))
+    stops = set(np.append(seeds, root)) | {-1}
 
     segments = []
     lop = dict(zip(node_ids, parent_ids))
@@ -2244,6 +3519,32 @@ def extract_short_segments(node_ids, parent_ids):
     return sorted(segments, key=lambda x: len(x), reverse=True)
 
 
+def split_segments(segments, values):
+    """Split segments wherever given per-node values change.
+
+    Pieces overlap by one node such that they stay connected.
+
+    Parameters
+    ----------
+    segments :  list of lists
+                Segments as lists of node IDs.
+    values :    dict
+                Node ID -> value (e.g. Strahler index).
+
+    """
+    split = []
+    for seg in segments:
+        start = 0
+        for i in range(1, len(seg)):
+            if values[seg[i]] != values[seg[i - 1]]:
+                split.append(seg[start:i + 1])
+                start = i
+        if len(seg) - start > 1:
+            split.append(seg[start:])
+
+    return split
+
+
 def extract_long_segments(node_ids, parent_ids):
     """Extract linear segments for given neuron maximizing length."""
     # Create child -> parent dict
@@ -2284,6 +3585,66 @@ def extract_long_segments(node_ids, parent_ids):
     return segments
 
 
+def parse_x3d_mesh(mesh_str):
+    """Parse vertices and faces from CATMAID's X3D mesh representation.
+
+    Parameters
+    ----------
+    mesh_str :  str
+                X3D string as stored by CATMAID (``IndexedTriangleSet``
+                or ``IndexedFaceSet``).
+
+    Returns
+    -------
+    vertices :  (N, 3) array
+                Unique vertices (not yet transformed).
+    faces :     array
+                Faces indexing into ``vertices``.
+
+    """
+    mesh_type = re.search('<(.*?) ', mesh_str).group(1)
+
+    # Now reverse engineer the mesh
+    if mesh_type == 'IndexedTriangleSet':
+        t = re.search("index='(.*?)'", mesh_str).group(1).split(' ')
+        faces = [(int(t[i]), int(t[i + 1]), int(t[i + 2]))
+                 for i in range(0, len(t) - 2, 3)]
+
+        v = re.search("point='(.*?)'", mesh_str).group(1).split(' ')
+        vertices = [(float(v[i]), float(v[i + 1]), float(v[i + 2]))
+                    for i in range(0, len(v) - 2, 3)]
+
+    elif mesh_type == 'IndexedFaceSet':
+        # For this type, each face is indexed and an index of -1 indicates
+        # the end of this face set
+        t = re.search("coordIndex='(.*?)'", mesh_str).group(1).split(' ')
+        faces = []
+        this_face = []
+        for f in t:
+            if int(f) != -1:
+                this_face.append(int(f))
+            else:
+                faces.append(this_face)
+                this_face = []
+
+        # Make sure the last face is also appended
+        if this_face:
+            faces.append(this_face)
+
+        v = re.search("point='(.*?)'", mesh_str).group(1).split(' ')
+        vertices = [(float(v[i]), float(v[i + 1]), float(v[i + 2]))
+                    for i in range(0, len(v) - 2, 3)]
+    else:
+        print(f"Unknown volume type: {mesh_type}")
+        raise TypeError(f"Unknown volume type: {mesh_type}")
+
+    # Collapse to unique vertices
+    verts, inv = np.unique(vertices, return_inverse=True, axis=0)
+    faces = inv.reshape(-1)[np.array(faces)]
+
+    return verts, faces
+
+
 def import_mesh(vertices, faces, name='mesh'):
     """Import mesh into scene."""
     if isinstance(vertices, np.ndarray):
@@ -2302,6 +3663,330 @@ def import_mesh(vertices, faces, name='mesh'):
     me.update()
 
 
+def iter_json_array(x, chunk_size=50_000):
+    """Yield JSON encoding of a 2D array in chunks.
+
+    Produces the same string as ``json.dumps(x.tolist())`` but never holds
+    more than ``chunk_size`` rows as Python objects at a time.
+    """
+    x = np.asarray(x)
+    yield '['
+    for i in range(0, x.shape[0], chunk_size):
+        if i:
+            yield ', '
+        yield json.dumps(x[i:i + chunk_size].tolist())[1:-1]
+    yield ']'
+
+
+def encode_form(fields):
+    """URL-encode form fields into a POST body.
+
+    Values can be strings or iterables of strings. The latter are encoded
+    piece by piece such that large values (e.g. meshes) never exist as a
+    single Python string. The returned `bytearray` can be passed to `fetch`
+    as is - don't copy it into `bytes`.
+    """
+    body = bytearray()
+    for i, (key, value) in enumerate(fields.items()):
+        if i:
+            body += b'&'
+        body += urllib.parse.quote_plus(key).encode() + b'='
+        if isinstance(value, str):
+            value = [value]
+        for chunk in value:
+            body += urllib.parse.quote_plus(chunk).encode()
+    return body
+
+
+def run_concurrently(**tasks):
+    """Run independent tasks in parallel threads.
+
+    Parameters
+    ----------
+    **tasks
+                Callables without arguments (use e.g. ``functools.partial``).
+
+    Returns
+    -------
+    dict
+                Maps task names to their results.
+
+    """
+    if len(tasks) <= 1:
+        return {k: f() for k, f in tasks.items()}
+
+    with ThreadPoolExecutor(max_workers=len(tasks)) as executor:
+        futures = {k: executor.submit(f) for k, f in tasks.items()}
+
+    return {k: f.result() for k, f in futures.items()}
+
+
+def start_timings(label):
+    """Reset timings and start recording spans (see `timing_span`)."""
+    track_memory = get_pref('track_memory', False)
+    with TIMINGS['lock']:
+        TIMINGS.update({'active': True, 'label': label, 'total': 0,
+                        'stages': {}, 'neurons': {}, 'neuron_memory': {},
+                        'started': time.time(),
+                        'track_memory': track_memory,
+                        'started_tracemalloc': False})
+    if track_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        TIMINGS['started_tracemalloc'] = True
+
+
+def stop_timings():
+    """Stop recording spans and return timings."""
+    with TIMINGS['lock']:
+        if TIMINGS['active']:
+            TIMINGS['active'] = False
+            TIMINGS['total'] = time.time() - TIMINGS['started']
+    if TIMINGS.get('started_tracemalloc'):
+        tracemalloc.stop()
+        TIMINGS['started_tracemalloc'] = False
+    return get_timings()
+
+
+@contextmanager
+def timing_span(stage, neuron=None):
+    """Time the enclosed block as given stage (and neuron).
+
+    Only records anything between `start_timings` and `stop_timings`. Spans
+    can be nested (e.g. "json decode" happens during "download") and may
+    run in parallel threads, so stage times can add up to more than the
+    total.
+
+    If memory tracking is enabled in the preferences, also records the peak
+    Python memory allocated during the span (via tracemalloc). Note that
+    this includes allocations by other threads running at the same time.
+    """
+    if not TIMINGS['active']:
+        yield
+        return
+
+    track = TIMINGS['track_memory'] and tracemalloc.is_tracing()
+    if track:
+        stack = _SPANS.__dict__.setdefault('stack', [])
+        if stack:
+            # Keep the enclosing span's peak before we reset it
+            stack[-1][1] = max(stack[-1][1], tracemalloc.get_traced_memory()[1])
+        mem_start = tracemalloc.get_traced_memory()[0]
+        if hasattr(tracemalloc, 'reset_peak'):  # Python 3.9+
+            tracemalloc.reset_peak()
+        stack.append([mem_start, 0])
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+
+        memory = None
+        if track:
+            mem_start, child_peak = stack.pop()
+            current, peak = tracemalloc.get_traced_memory()
+            if not hasattr(tracemalloc, 'reset_peak'):
+                # Without resetting, the peak covers the entire trace
+                peak = current
+            peak = max(peak, child_peak)
+            if stack:
+                stack[-1][1] = max(stack[-1][1], peak)
+            memory = max(peak - mem_start, 0)
+
+        record_span(stage, elapsed, neuron=neuron, memory=memory)
+
+
+def record_span(stage, elapsed, neuron=None, memory=None):
+    """Add time (in seconds) and peak memory (bytes) to given stage (and neuron)."""
+    with TIMINGS['lock']:
+        if not TIMINGS['active']:
+            return
+        this = TIMINGS['stages'].setdefault(stage, {'time': 0, 'count': 0})
+        this['time'] += elapsed
+        this['count'] += 1
+        if memory is not None:
+            this['peak_memory'] = max(this.get('peak_memory', 0), memory)
+        if neuron is not None:
+            this = TIMINGS['neurons'].setdefault(str(neuron), {})
+            this[stage] = this.get(stage, 0) + elapsed
+            if memory is not None:
+                this = TIMINGS['neuron_memory'].setdefault(str(neuron), {})
+                this[stage] = max(this.get(stage, 0), memory)
+
+
+def get_timings():
+    """Return copy of current timings.
+
+    Returns
+    -------
+    dict
+                ``label``: description of the timed operation
+                ``total``: wall time in seconds
+                ``stages``: ``{stage: {'time': seconds, 'count': n}}`` plus
+                ``peak_memory`` (bytes) if memory is tracked
+                ``neurons``: ``{skeleton_id: {stage: seconds}}``
+                ``neuron_memory``: ``{skeleton_id: {stage: peak bytes}}``
+
+    """
+    with TIMINGS['lock']:
+        return {'label': TIMINGS['label'],
+                'total': TIMINGS['total'],
+                'stages': {k: dict(v) for k, v in TIMINGS['stages'].items()},
+                'neurons': {k: dict(v) for k, v in TIMINGS['neurons'].items()},
+                'neuron_memory': {k: dict(v) for k, v in TIMINGS['neuron_memory'].items()}}
+
+
+class SamplingProfiler:
+    """Statistical profiler: periodically samples the call stack of a thread.
+
+    Much lower overhead than cProfile but only approximate.
+
+    Parameters
+    ----------
+    interval :  float
+                Seconds between samples.
+    thread_id : int, optional
+                Thread to sample. Defaults to the current thread.
+
+    """
+
+    def __init__(self, interval=0.005, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id if thread_id else threading.get_ident()
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if stack:
+                self.stacks[tuple(reversed(stack))] += 1
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def summary(self, top_n=20):
+        """Return top functions by samples as string."""
+        total = sum(self.stacks.values())
+        own, cumulative = Counter(), Counter()
+        for stack, n in self.stacks.items():
+            own[stack[-1]] += n
+            for func in set(stack):
+                cumulative[func] += n
+
+        lines = [f'{total} samples ({self.interval * 1000:.0f}ms interval)',
+                 f'{"own %":>7} {"cum %":>7}  function']
+        for func, n in cumulative.most_common(top_n):
+            lines.append(f'{own[func] / total:>7.1%} {n / total:>7.1%}  {func}')
+        return '\n'.join(lines)
+
+    def write(self, filepath):
+        """Write stacks in "folded" format (e.g. for flamegraph.pl or speedscope)."""
+        with open(filepath, 'w') as f:
+            for stack, n in self.stacks.items():
+                f.write(';'.join(stack) + f' {n}\n')
+
+
+def profiled(execute):
+    """Wrap an operator's `execute` in a profiler if enabled in the preferences.
+
+    With "cProfile", writes a .prof file (open with e.g. snakeviz or
+    `pstats`); with "Sampling", writes folded stacks. Either way, a summary
+    of the top functions is printed to the console.
+    """
+    @wraps(execute)
+    def wrapper(self, context):
+        mode = get_pref('profiling', 'OFF')
+        if mode == 'OFF':
+            return execute(self, context)
+
+        top_n = get_pref('profile_top_n', 20)
+        out_dir = get_pref('profile_dir', '') or os.path.join(get_cache_dir(), 'profiles')
+        out_dir = bpy.path.abspath(out_dir)
+        os.makedirs(out_dir, exist_ok=True)
+        name = f"{self.bl_idname.replace('.', '_')}_{time.strftime('%Y%m%d-%H%M%S')}"
+
+        if mode == 'CPROFILE':
+            profiler = cProfile.Profile()
+            profiler.enable()
+        else:
+            profiler = SamplingProfiler()
+            profiler.start()
+
+        try:
+            return execute(self, context)
+        finally:
+            if mode == 'CPROFILE':
+                profiler.disable()
+                filepath = os.path.join(out_dir, name + '.prof')
+                profiler.dump_stats(filepath)
+                summary = io.StringIO()
+                pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(top_n)
+                summary = summary.getvalue()
+            else:
+                profiler.stop()
+                filepath = os.path.join(out_dir, name + '.folded')
+                profiler.write(filepath)
+                summary = profiler.summary(top_n)
+
+            print(f'Profile of "{self.bl_label}":')
+            print(summary)
+            print(f'Profile saved to {filepath}')
+
+    wrapper.profiled = True
+    return wrapper
+
+
+def to_timestamp(x):
+    """Convert a CATMAID time (POSIX timestamp or ISO 8601 string) to POSIX timestamp."""
+    if isinstance(x, str):
+        t = datetime.fromisoformat(x.replace('Z', '+00:00'))
+        if t.tzinfo is None:
+            t = t.replace(tzinfo=timezone.utc)
+        return t.timestamp()
+    return float(x)
+
+
+def split_names(x):
+    """Split comma-separated string into list of stripped names.
+
+    Strings in quotation marks are not split (e.g. for names with commas).
+    """
+    if not x:
+        return []
+    if x.startswith('"') and x.endswith('"'):
+        return [x[1:-1]]
+    return [e.strip() for e in x.split(',') if e.strip()]
+
+
+def print_timings(timings):
+    """Print summary of timings (see `get_timings`)."""
+    if timings['stages']:
+        print(f"Finished {timings['label']} in {timings['total']:.1f}s (" +
+              ', '.join([f"{k}: {v['time']:.2f}s" for k, v in timings['stages'].items()]) + ')')
+
+
+def get_cache_dir():
+    """Return (and create) directory for files cached on disk."""
+    if not bpy:
+        path = os.path.join(os.path.expanduser('~'), '.cache', 'CATMAIDImport')
+        os.makedirs(path, exist_ok=True)
+        return path
+    return bpy.utils.user_resource('DATAFILES', path='CATMAIDImport', create=True)
+
+
 def make_iterable(x, force_type=None):
     """Convert input into a np.ndarray, if it isn't already.
 
@@ -2321,8 +4006,11 @@ def make_iterable(x, force_type=None):
 
 
 def get_pref(key, default=None):
-    """Fetch given key from preferences."""
-    if 'CATMAIDImport' in bpy.context.preferences.addons:
+    """Fetch given key from preferences.
+
+    Outside of Blender (or if the add-on is not registered) returns `default`.
+    """
+    if bpy and 'CATMAIDImport' in bpy.context.preferences.addons:
         prefs = bpy.context.preferences.addons['CATMAIDImport'].preferences
 
         if hasattr(prefs, key):
@@ -2382,54 +4070,225 @@ def random_colors(color_count, color_range='RGB',
     return colors
 
 
-def cluster_kmeans(points, n_clusters):
-    """Produce a k-means clustering for given coordinates."""
-    points = np.asarray(points)
-    # Assign each point to a random cluster but make sure each cluster shows
-    # up at least once
-    clust = list(range(n_clusters)) * math.ceil(len(points) / n_clusters)
-    clust = np.array(clust)[:len(points)]
-    np.random.shuffle(clust)
+def set_color(obj, color, palette=False):
+    """Set color of given neuron object.
+
+    Parameters
+    ----------
+    obj :       bpy object
+    color :     tuple
+                RGB or RGBA color.
+    palette :   bool
+                If True, will assign a material shared by all objects with
+                this color. If False, will make sure the object has its own
+                material and change that material's color.
+
+    """
+    color = list(color)
+    if len(color) == 3:
+        color.append(1)
+
+    if palette:
+        obj.active_material = get_palette_material(color)
+        return
+
+    # Switch from shared palette back to the neuron's own material
+    mat = obj.active_material
+    if not mat or mat.name.startswith('CATMAID palette'):
+        if obj.get('subtype') == 'CONNECTORS':
+            settings = DEFAULTS['connectors'][int(obj['cn_type'])]
+            mat_name = f'{settings["name"]} of #{obj["id"]}'
+        else:
+            mat_name = f'M#{obj["id"]}'[:59]
+        mat = bpy.data.materials.get(mat_name) or bpy.data.materials.new(mat_name)
+        obj.active_material = mat
+
+    mat.diffuse_color = color
 
-    while True:
-        # Get cluster centers
-        centers = np.array([points[clust == i].mean(axis=0) for i in np.unique(clust)])
 
-        # For each point get the distance to the cluster centers
-        dists = [np.linalg.norm(points - centers[i], axis=1) for i in np.unique(clust)]
-        dists = np.array(dists).T
+def get_palette_material(color):
+    """Get or create material shared by all objects with given color."""
+    color = [min(max(c, 0), 1) for c in color]
+    if len(color) == 3:
+        color.append(1)
 
-        new_clust = np.argmin(dists, axis=1)
+    # Colors are binned to 8bit
+    hex_color = ''.join(f'{round(c * 255):02x}' for c in color)
+    mat_name = f'CATMAID palette #{hex_color}'
 
-        if np.all(new_clust == clust):
+    mat = bpy.data.materials.get(mat_name)
+    if not mat:
+        mat = bpy.data.materials.new(mat_name)
+        mat.diffuse_color = [round(c * 255) / 255 for c in color]
+    return mat
+
+
+def cluster_kmeans(points, n_clusters, max_iter=300, tol=1e-4, seed=0):
+    """Produce a k-means clustering for given coordinates.
+
+    Uses k-means++ seeding and stops after ``max_iter`` iterations or once
+    the cluster centers move less than ``tol`` (relative to the spread of
+    the points).
+
+    Parameters
+    ----------
+    points :        (N, 3) array
+    n_clusters :    int
+    max_iter :      int
+                    Max number of iterations.
+    tol :           float
+                    Relative tolerance for convergence.
+    seed :          int
+                    Seed for the random number generator. Makes clustering
+                    reproducible.
+
+    Returns
+    -------
+    clust :         (N, ) array
+                    Cluster index for each point.
+    centers :       (n_clusters, 3) array
+                    Cluster centers.
+    dists :         (N, ) array
+                    Distance of each point to its cluster center.
+
+    """
+    points = np.asarray(points, dtype=float)
+    n_clusters = max(1, min(n_clusters, len(points)))
+    rng = np.random.default_rng(seed)
+
+    def sq_dists(centers):
+        # |p - c|^2 = |p|^2 - 2 p.c + |c|^2 -> avoids (N, K, 3) intermediate
+        d = (points ** 2).sum(axis=1)[:, None] - 2 * points @ centers.T + (centers ** 2).sum(axis=1)[None, :]
+        return np.maximum(d, 0)
+
+    # k-means++ initialization
+    centers = np.empty((n_clusters, points.shape[1]))
+    centers[0] = points[rng.integers(len(points))]
+    closest = sq_dists(centers[:1])[:, 0]
+    for k in range(1, n_clusters):
+        total = closest.sum()
+        if total > 0:
+            ix = rng.choice(len(points), p=closest / total)
+        else:
+            ix = rng.integers(len(points))
+        centers[k] = points[ix]
+        closest = np.minimum(closest, sq_dists(centers[k:k + 1])[:, 0])
+
+    tol = tol * points.var(axis=0).sum()
+    for i in range(max_iter):
+        d = sq_dists(centers)
+        clust = d.argmin(axis=1)
+
+        # Compute new centers
+        counts = np.bincount(clust, minlength=n_clusters)
+        sums = np.zeros_like(centers)
+        np.add.at(sums, clust, points)
+        new_centers = centers.copy()
+        has_points = counts > 0
+        new_centers[has_points] = sums[has_points] / counts[has_points, None]
+
+        # Re-seed empty clusters with the points furthest from their center
+        if not np.all(has_points):
+            furthest = np.argsort(d[np.arange(len(points)), clust])[::-1]
+            new_centers[~has_points] = points[furthest[:(~has_points).sum()]]
+
+        shift = ((new_centers - centers) ** 2).sum()
+        centers = new_centers
+        if shift <= tol:
             break
 
-        clust = new_clust
+    d = sq_dists(centers)
+    clust = d.argmin(axis=1)
+    dists = np.sqrt(d[np.arange(len(points)), clust])
 
-    return clust, centers, dists.min(axis=1)
+    return clust, centers, dists
 
 
 def get_skids(selected_only=False):
     """Return all unique skeleton IDs in the scene."""
-    if selected_only:
-        to_check = bpy.context.selected_objects
-    else:
-        to_check = bpy.data.objects
+    if not selected_only:
+        return set(get_skid_index())
 
     skids = set()
-    for obj in to_check:
+    for obj in bpy.context.selected_objects:
         if 'type' in obj and obj['type'] == 'NEURON':
             skids.add(obj['id'])
     return skids
 
 
+def get_skid_index():
+    """Return index mapping skeleton IDs to their objects.
+
+    The index has the format ``{skeleton_id: {subtype: [object names]}}``
+    and is rebuilt lazily whenever it has been flagged as stale (see the
+    handlers registered in ``register()``).
+    """
+    if SKID_INDEX['stale']:
+        rebuild_skid_index()
+    return SKID_INDEX['index']
+
+
+def rebuild_skid_index():
+    """Rebuild skeleton ID -> objects index from scratch."""
+    index = {}
+    for obj in bpy.data.objects:
+        if 'CATMAID_object' not in obj or 'id' not in obj:
+            continue
+        if obj.get('type') != 'NEURON':
+            continue
+        entry = index.setdefault(obj['id'], {})
+        entry.setdefault(obj.get('subtype'), []).append(obj.name)
+
+    SKID_INDEX['index'] = index
+    SKID_INDEX['objects'] = set(bpy.data.objects.keys())
+    SKID_INDEX['stale'] = False
+
+
+def index_object(obj):
+    """Add a newly created neuron object to the skeleton ID index."""
+    # Only do incremental updates if we know that this is the only object
+    # that was added since the index was last updated
+    known = SKID_INDEX['objects']
+    if (SKID_INDEX['stale'] or obj.name in known
+            or len(bpy.data.objects) != len(known) + 1):
+        SKID_INDEX['stale'] = True
+        return
+
+    entry = SKID_INDEX['index'].setdefault(obj['id'], {})
+    entry.setdefault(obj['subtype'], []).append(obj.name)
+    known.add(obj.name)
+
+
+@persistent
+def _skid_index_on_undo(*args):
+    """Flag skeleton ID index as stale after undo/redo or loading a file."""
+    SKID_INDEX['stale'] = True
+
+
+@persistent
+def _skid_index_on_depsgraph(*args):
+    """Flag skeleton ID index as stale if objects were added, removed or renamed."""
+    if SKID_INDEX['stale']:
+        return
+    # Comparing counts alone misses e.g. one object deleted and another
+    # added in the same update
+    if set(bpy.data.objects.keys()) != SKID_INDEX['objects']:
+        SKID_INDEX['stale'] = True
+
+
 def get_neuron_objects(neurites=True, somas=True, connectors=False,
                        selected_only=False):
     """Return all neuron objects in the scene."""
     if selected_only:
         to_check = bpy.context.selected_objects
     else:
-        to_check = bpy.data.objects
+        to_check = []
+        for skid in list(get_skid_index()):
+            to_check += skeleton_id_objects(skid,
+                                            neurites=neurites,
+                                            somas=somas,
+                                            connectors=connectors)
+        return to_check
 
     objects = []
     for obj in to_check:
@@ -2449,44 +4308,162 @@ def get_neuron_objects(neurites=True, somas=True, connectors=False,
 
 
 def delete_neuron_objects(skeleton_ids, neurites=True, somas=True, connectors=True):
-    """Delete neuron objects for given skeleton ID(s)."""
-    skeleton_ids = make_iterable(skeleton_ids)
+    """Delete neuron objects for given skeleton ID(s).
 
-    # First deselect all objects
-    for obj in bpy.data.objects:
-        obj.select_set(False)
+    This also removes the objects' curves/meshes and any materials that are
+    left without users afterwards.
+    """
+    skeleton_ids = make_iterable(skeleton_ids)
 
-    # Now select objects to delete
+    objects = []
     for skid in skeleton_ids:
-        to_delete = skeleton_id_objects(skid,
-                                        neurites=neurites,
-                                        somas=somas,
-                                        connectors=connectors)
-        for obj in to_delete:
-            obj.select_set(True)
+        objects += skeleton_id_objects(skid,
+                                       neurites=neurites,
+                                       somas=somas,
+                                       connectors=connectors)
+
+    # Collect datablocks used only by these objects and candidate materials
+    data = []
+    materials = {}
+    for obj in objects:
+        if obj.data and obj.data.users == 1:
+            data.append(obj.data)
+        for slot in obj.material_slots:
+            if slot.material:
+                materials[slot.material.name] = slot.material
+
+    # Unused Strahler materials also belong to this neuron
+    if neurites:
+        for skid in skeleton_ids:
+            i = 1
+            while f'#{skid} StrahlerMat {i}' in bpy.data.materials:
+                mat = bpy.data.materials[f'#{skid} StrahlerMat {i}']
+                materials[mat.name] = mat
+                i += 1
+
+    if neurites:
+        registry = get_skeleton_registry()
+        for skid in skeleton_ids:
+            if str(skid) in registry:
+                del registry[str(skid)]
+
+    print(f'Deleting {len(objects)} objects from scene')
+
+    batch_remove(objects + data)
+    # Only remove materials that are not used anywhere else
+    batch_remove([m for m in materials.values() if m.users == 0])
+
+    SKID_INDEX['stale'] = True
+
+
+def get_skeleton_registry(scene=None):
+    """Return registry of skeletons imported into the scene.
+
+    The registry is stored as custom property on the scene and has the
+    format ``{skeleton_id: {'node_count': int, 'fetched_at': float,
+    'imported_at': float, ...}}`` where the remaining fields are the options
+    used for the import. `fetched_at` is the time the skeleton was
+    requested from the server (see `get_changed_skeletons`).
+    """
+    if not scene:
+        scene = bpy.context.scene
+
+    if 'catmaid_skeletons' not in scene:
+        scene['catmaid_skeletons'] = {}
+
+    return scene['catmaid_skeletons']
 
-    print(f'Deleting {len(bpy.context.selected_objects)} from scene')
 
-    # Delete selected objects
-    bpy.ops.object.delete(use_global=False)
+def get_changed_skeletons(skeleton_ids):
+    """Return those skeletons that changed on the server since import.
+
+    A skeleton counts as changed if its node count differs from the one at
+    the time of the import or if it was edited after it was downloaded. Both
+    come from the server's skeleton summaries (one small row per skeleton,
+    see `CatmaidClient.get_skeleton_summaries`). Skeletons without an entry
+    in the registry (e.g. imported with an older version) are never reported.
+
+    Parameters
+    ----------
+    skeleton_ids :  iterable
+
+    """
+    registry = get_skeleton_registry()
+    skeleton_ids = {str(s) for s in skeleton_ids if str(s) in registry}
+    if not skeleton_ids:
+        return set()
+
+    try:
+        summaries = client.get_skeleton_summaries(list(skeleton_ids))
+    except requests.exceptions.HTTPError as e:
+        # Older servers: fall back to comparing node counts
+        print(f'Unable to fetch skeleton summaries, comparing node counts only: {e}')
+        counts = client.get_node_counts(list(skeleton_ids))
+        summaries = {str(s): (c, 0) for s, c in counts.items()}
+
+    changed = set()
+    for s in skeleton_ids:
+        if s not in summaries:
+            continue
+        n_nodes, last_edited = summaries[s]
+        # Older entries only have the (slightly later) import time
+        fetched_at = registry[s].get('fetched_at', registry[s]['imported_at'])
+        if n_nodes != registry[s]['node_count'] or last_edited > fetched_at:
+            changed.add(s)
+
+    return changed
+
+
+def batch_remove(datablocks):
+    """Remove given datablocks (objects, curves, meshes, etc.) from the file."""
+    if not datablocks:
+        return
+
+    # `batch_remove` is much faster than removing datablocks one by one
+    if hasattr(bpy.data, 'batch_remove'):
+        bpy.data.batch_remove(datablocks)
+        return
+
+    collections = {bpy.types.Object: bpy.data.objects,
+                   bpy.types.Curve: bpy.data.curves,
+                   bpy.types.Mesh: bpy.data.meshes,
+                   bpy.types.Material: bpy.data.materials}
+    for db in datablocks:
+        for ty, coll in collections.items():
+            if isinstance(db, ty):
+                coll.remove(db)
+                break
 
 
 def skeleton_id_objects(skeleton_id, neurites=True, somas=True, connectors=False,
                         selected_only=False):
     """Get all objects matching the given skeleton ID."""
     skeleton_id = str(skeleton_id)
-    objects = get_neuron_objects(neurites=neurites,
-                                 somas=somas,
-                                 connectors=connectors,
-                                 selected_only=selected_only)
 
-    matches = []
-    for obj in objects:
-        if 'id' not in obj:
-            continue
-        if obj['id'] != skeleton_id:
-            continue
-        matches.append(obj)
+    subtypes = []
+    if neurites:
+        subtypes.append('NEURITES')
+    if somas:
+        subtypes.append('SOMA')
+    if connectors:
+        subtypes.append('CONNECTORS')
+
+    for attempt in range(2):
+        entry = get_skid_index().get(skeleton_id, {})
+        names = [n for st in subtypes for n in entry.get(st, [])]
+        matches = [bpy.data.objects.get(n) for n in names]
+
+        # If objects were renamed or deleted since the index was last updated
+        # we need to rebuild it
+        if all(obj is not None and obj.get('id') == skeleton_id for obj in matches):
+            break
+        SKID_INDEX['stale'] = True
+
+    matches = [obj for obj in matches if obj is not None]
+
+    if selected_only:
+        matches = [obj for obj in matches if obj.select_get()]
+
     return matches
 
 
@@ -2562,6 +4539,7 @@ def strahler_index(node_ids, parent_ids):
 
 def prepare_strahler_mats(skid, max_strahler_index, color):
     """Create set of Strahler index materials for this neuron."""
+    mats = []
     for i in range(1, (max_strahler_index + 1)):
         mat_name = f'#{skid} StrahlerMat {i}'
 
@@ -2571,9 +4549,93 @@ def prepare_strahler_mats(skid, max_strahler_index, color):
         if len(this_color) == 3:
             this_color.append(1)
 
-        mat = bpy.data.materials.get(mat_name,
-                                     bpy.data.materials.new(mat_name))
+        mat = bpy.data.materials.get(mat_name) or bpy.data.materials.new(mat_name)
         mat.diffuse_color = this_color
+        mats.append(mat)
+
+    return mats
+
+
+def split_by_strahler(ob):
+    """Split the splines of a neurite curve wherever the Strahler index changes.
+
+    Uses the per-point Strahler indices stored at import and replaces them
+    with one index per spline. Pieces overlap by one point (as in
+    `split_segments`) such that they stay connected.
+    """
+    cu = ob.data
+    point_SI = np.array(list(ob['point_strahler']), dtype=np.int32)
+
+    pieces = []
+    spline_SI = []
+    offset = 0
+    for sp in cu.splines:
+        n = len(sp.points)
+        co = np.zeros(n * 4, dtype=np.float32)
+        weight = np.zeros(n, dtype=np.float32)
+        radius = np.zeros(n, dtype=np.float32)
+        sp.points.foreach_get('co', co)
+        sp.points.foreach_get('weight', weight)
+        sp.points.foreach_get('radius', radius)
+        co = co.reshape(n, 4)
+
+        si = point_SI[offset:offset + n]
+        offset += n
+
+        starts = [0] + (np.nonzero(si[1:] != si[:-1])[0] + 1).tolist()
+        ends = starts[1:] + [n - 1]
+        for start, end in zip(starts, ends):
+            if end > start:
+                pieces.append((co[start:end + 1], weight[start:end + 1], radius[start:end + 1]))
+                spline_SI.append(int(si[start]))
+
+    cu.splines.clear()
+    for co, weight, radius in pieces:
+        sp = cu.splines.new('POLY')
+        sp.points.add(len(co) - 1)
+        sp.points.foreach_set('co', co.ravel())
+        sp.points.foreach_set('weight', weight)
+        sp.points.foreach_set('radius', radius)
+
+    ob['strahler'] = spline_SI
+    del ob['point_strahler']
+
+
+def set_strahler_colors(skeleton_id, color):
+    """Color neuron by the Strahler indices stored on its objects.
+
+    Neurites that haven't been split by Strahler index yet are split first
+    (see `split_by_strahler`). Returns False if the neuron's objects have no
+    Strahler indices (i.e. were imported with an older version of this
+    plugin).
+    """
+    neurites = skeleton_id_objects(skeleton_id, neurites=True, somas=False)
+    somas = skeleton_id_objects(skeleton_id, neurites=False, somas=True)
+
+    if not neurites or any('strahler' not in ob and 'point_strahler' not in ob
+                           for ob in neurites):
+        return False
+
+    for ob in neurites:
+        if 'strahler' not in ob:
+            split_by_strahler(ob)
+
+    spline_SI = [np.array(list(ob['strahler']), dtype=int) for ob in neurites]
+    max_SI = max([si.max() for si in spline_SI] + [ob.get('strahler', 1) for ob in somas])
+    mats = prepare_strahler_mats(skeleton_id,
+                                 max_strahler_index=int(max_SI),
+                                 color=color)
+
+    for ob, si in zip(neurites, spline_SI):
+        ob.data.materials.clear()
+        for mat in mats:
+            ob.data.materials.append(mat)
+        ob.data.splines.foreach_set('material_index', si - 1)
+
+    for ob in somas:
+        ob.active_material = mats[ob.get('strahler', max_SI) - 1]
+
+    return True
 
 
 def eval_skids(x):
@@ -2626,25 +4688,96 @@ def eval_skids(x):
         raise TypeError(f'Unable to parse skeleton IDs from type "{type(x)}"')
 
 
-def apply_global_xforms(points, inverse=False):
-    """Apply globally defined transforms to coordinates."""
-    global_scale = 1 / get_pref('scale_factor', 10_000)
-    up = get_pref('axis_up', 'Z')
-    forward = get_pref('axis_forward', 'Y')
+AXES = {'X': (1, 0, 0), 'Y': (0, 1, 0), 'Z': (0, 0, 1),
+        '-X': (-1, 0, 0), '-Y': (0, -1, 0), '-Z': (0, 0, -1)}
+
+
+def axis_conversion(from_forward='Y', from_up='Z', to_forward='Y', to_up='Z'):
+    """Return 3x3 matrix converting between two axis conventions.
+
+    Same as `bpy_extras.io_utils.axis_conversion` but as numpy array and
+    hence usable outside of Blender.
+    """
+    def basis(forward, up):
+        if forward[-1] == up[-1]:
+            raise ValueError(f'Forward ("{forward}") and up ("{up}") axes '
+                             'must be different')
+        f, u = np.array(AXES[forward], float), np.array(AXES[up], float)
+        # Rows: right, forward, up
+        return np.array([np.cross(f, u), f, u])
+
+    return basis(to_forward, to_up).T @ basis(from_forward, from_up)
+
 
-    # Note: `Matrix` is available at global namespace in Blender
-    global_matrix = axis_conversion(from_forward=forward,
-                                    from_up=up,
-                                    ).to_4x4() @ Matrix.Scale(global_scale, 4)
+# Matrices for `apply_global_xforms` (inverse -> matrix). Reset by the
+# preferences that define them (see `reset_global_xforms`)
+XFORM_MATRICES = {}
 
+
+def global_xform_matrix(inverse=False):
+    """Return 3x3 matrix for `apply_global_xforms` (to multiply from the right).
+
+    Built from the preferences on first use and then cached until they
+    change.
+    """
+    matrix = XFORM_MATRICES.get(inverse)
+    if matrix is not None:
+        return matrix
+
+    scale_factor = get_pref('scale_factor', 10_000)
+    rotation = axis_conversion(from_forward=get_pref('axis_forward', 'Y'),
+                               from_up=get_pref('axis_up', 'Z'))
+
+    # Rotations are orthogonal: the inverse is the transpose
     if inverse:
-        global_matrix = np.linalg.inv(global_matrix)
+        matrix = rotation * scale_factor
+    else:
+        matrix = rotation.T / scale_factor
 
-    # Add a fourth column to points
-    points_mat = np.ones((points.shape[0], 4))
-    points_mat[:, :3] = points
+    # Read-only as it is shared between calls
+    matrix.setflags(write=False)
+    XFORM_MATRICES[inverse] = matrix
+    return matrix
 
-    return np.dot(global_matrix, points_mat.T).T[:, :3]
+
+def reset_global_xforms(self=None, context=None):
+    """Drop cached transform matrices (``update`` callback of preferences)."""
+    XFORM_MATRICES.clear()
+
+
+def apply_global_xforms(points, inverse=False):
+    """Apply globally defined transforms to coordinates.
+
+    Parameters
+    ----------
+    points :    (N, 3) array
+    inverse :   bool
+                If True, convert from Blender space back to CATMAID space.
+
+    Returns
+    -------
+    (N, 3) array
+                float32 for float32 input, float64 otherwise.
+
+    """
+    points = np.asarray(points)
+    dtype = np.result_type(points.dtype, np.float32)
+    matrix = global_xform_matrix(inverse=inverse).astype(dtype, copy=False)
+
+    return np.matmul(points, matrix, dtype=dtype)
+
+
+def _update_axis_forward(self, context):
+    # Forward and up must be different axes (as in bpy_extras' orientation_helper)
+    if self.axis_forward[-1] == self.axis_up[-1]:
+        self.axis_up = self.axis_up[:-1] + 'XYZ'[('XYZ'.index(self.axis_up[-1]) + 1) % 3]
+    reset_global_xforms()
+
+
+def _update_axis_up(self, context):
+    if self.axis_up[-1] == self.axis_forward[-1]:
+        self.axis_forward = self.axis_forward[:-1] + 'XYZ'[('XYZ'.index(self.axis_forward[-1]) + 1) % 3]
+    reset_global_xforms()
 
 
 ########################################
@@ -2652,7 +4785,6 @@ def apply_global_xforms(points, inverse=False):
 ########################################
 
 
-@orientation_helper(axis_forward='-Z', axis_up='-Y')
 class CATMAID_preferences(AddonPreferences):
     bl_idname = 'CATMAIDImport'
 
@@ -2685,11 +4817,63 @@ class CATMAID_preferences(AddonPreferences):
                               description='Restricting the number of parallel '
                                           'requests can help if you get errors '
                                           'when loading loads of neurons.')
+    use_name_index: BoolProperty(name="Local neuron index", default=False,
+                                 description='If True, will download an index '
+                                             'of all neuron names and sizes in '
+                                             'the background when connecting. '
+                                             'Searching by name and node count '
+                                             'then happens locally. The index '
+                                             'is stored on disk and refreshed '
+                                             'incrementally.')
+    low_memory: BoolProperty(name="Low memory mode", default=False,
+                             description='Download and build neurons in '
+                                         'batches and do not cache skeletons. '
+                                         'Use this when importing thousands '
+                                         'of neurons.')
+    track_memory: BoolProperty(name="Track memory usage", default=False,
+                               description='Record peak Python memory per '
+                                           'import stage and neuron (see '
+                                           '"Import Timings" panel). Slows '
+                                           'down imports.')
+    profiling: EnumProperty(name="Profiling",
+                            items=[('OFF', 'Off', 'Do not profile'),
+                                   ('CPROFILE', 'cProfile', 'Profile every function call (slows things down)'),
+                                   ('SAMPLING', 'Sampling', 'Sample the call stack every 5ms (low overhead)')],
+                            default='OFF',
+                            description='Profile CATMAID operators and write '
+                                        'the results to the profile directory '
+                                        '(e.g. to attach to bug reports)')
+    profile_dir: StringProperty(name="Profile directory", default='', subtype='DIR_PATH',
+                                description='Where to save profiles. Leave '
+                                            'empty to use the add-on\'s data '
+                                            'directory.')
+    profile_top_n: IntProperty(name="Functions in summary", default=20, min=1,
+                               description='Number of functions to print to '
+                                           'the console after profiling.')
+    slow_request_threshold: FloatProperty(name="Slow request threshold [s]",
+                                          default=10, min=0,
+                                          description='Requests taking longer '
+                                                      'than this are logged to '
+                                                      'the console. Set to 0 '
+                                                      'to disable.')
+    cache_max_age: IntProperty(name="Cache lifetime [min]",
+                               default=10, min=0,
+                               description='Data that rarely changes (e.g. the '
+                                           'list of annotations) is cached and '
+                                           're-used for this many minutes. '
+                                           'Reconnect to clear the cache.')
     scale_factor: IntProperty(name="CATMAID to Blender unit conversion Factor",
                               default=10000,
                               description='CATMAID units will be divided '
                                           'by this factor when imported '
-                                          'into Blender.')
+                                          'into Blender.',
+                              update=reset_global_xforms)
+    axis_forward: EnumProperty(name="Forward",
+                               items=[(a, f'{a} Forward', '') for a in AXES],
+                               default='-Z', update=_update_axis_forward)
+    axis_up: EnumProperty(name="Up",
+                          items=[(a, f'{a} Up', '') for a in AXES],
+                          default='-Y', update=_update_axis_up)
 
     def draw(self, context):
         layout = self.layout
@@ -2706,12 +4890,38 @@ class CATMAID_preferences(AddonPreferences):
         box.label(text="Connection settings:")
         box.prop(self, "time_out")
         box.prop(self, "max_requests")
+        box.prop(self, "cache_max_age")
+        box.prop(self, "slow_request_threshold")
+        box.prop(self, "use_name_index")
 
         box = layout.box()
         box.label(text="Import options:")
         box.prop(self, "scale_factor")
         box.prop(self, "axis_forward")
         box.prop(self, "axis_up")
+        box.prop(self, "low_memory")
+
+        box = layout.box()
+        box.label(text="Debugging:")
+        box.prop(self, "track_memory")
+        box.prop(self, "profiling")
+        row = box.row()
+        row.prop(self, "profile_dir")
+        row.enabled = self.profiling != 'OFF'
+        row = box.row()
+        row.prop(self, "profile_top_n")
+        row.enabled = self.profiling != 'OFF'
+
+        text = (f"Start-up: loading {STARTUP.get('import', 0) * 1000:.0f} ms, "
+                f"registering {STARTUP.get('register', 0) * 1000:.0f} ms")
+        box.label(text=text)
+        for module in (np, requests):
+            if module._lazy_load_time is None:
+                text = f"{module._lazy_name}: not loaded yet"
+            else:
+                text = (f"{module._lazy_name}: loaded on first use "
+                        f"({module._lazy_load_time * 1000:.0f} ms)")
+            box.label(text=text)
 
 
 ########################################
@@ -2722,7 +4932,11 @@ class CATMAID_preferences(AddonPreferences):
 classes = (CATMAID_PT_import_panel,
            CATMAID_PT_export_panel,
            CATMAID_PT_properties_panel,
+           CATMAID_PT_timings_panel,
            CATMAID_OP_connect,
+           CATMAID_OP_refresh_index,
+           CATMAID_OP_dump_timings,
+           CATMAID_OP_export_telemetry,
            CATMAID_OP_fetch_connectors,
            CATMAID_OP_fetch_neuron,
            CATMAID_OP_fetch_volume,
@@ -2737,17 +4951,168 @@ classes = (CATMAID_PT_import_panel,
            CATMAID_preferences)
 
 
+def get_handlers():
+    """Return (handler list, function) for all handlers of this add-on."""
+    return ((bpy.app.handlers.depsgraph_update_post, _skid_index_on_depsgraph),
+            (bpy.app.handlers.undo_post, _skid_index_on_undo),
+            (bpy.app.handlers.redo_post, _skid_index_on_undo),
+            (bpy.app.handlers.load_post, _skid_index_on_undo))
+
+
 def register():
+    start = time.perf_counter()
     for c in classes:
+        # Allow profiling operators (see preferences)
+        if 'execute' in c.__dict__ and not getattr(c.execute, 'profiled', False):
+            c.execute = profiled(c.execute)
         bpy.utils.register_class(c)
 
+    for h, func in get_handlers():
+        if func not in h:
+            h.append(func)
+
+    # Transforms may have been cached before the preferences existed
+    reset_global_xforms()
+
+    STARTUP['register'] = time.perf_counter() - start
+
 
 def unregister():
     for c in classes:
         bpy.utils.unregister_class(c)
 
+    for h, func in get_handlers():
+        if func in h:
+            h.remove(func)
+
+
+########################################
+#  Command line interface
+########################################
+
+
+def main(argv):
+    """Import neurons without UI, e.g. on a render node.
+
+    Run as::
+
+        blender -b scene.blend -P CATMAIDImport.py -- --annotation "glomerulus DA1" --output DA1.blend
+
+    Connection settings not given as arguments are taken from the
+    environment variables CATMAID_SERVER, CATMAID_TOKEN, CATMAID_PROJECT,
+    CATMAID_HTTP_USER and CATMAID_HTTP_PASSWORD.
+    """
+    def shard(x):
+        i, n = (int(v) for v in x.split('/'))
+        if not 0 < i <= n:
+            raise argparse.ArgumentTypeError('Shard must be "i/n" with 1 <= i <= n')
+        return i - 1, n
+
+    env = os.environ.get
+    parser = argparse.ArgumentParser(prog='blender -b -P CATMAIDImport.py --',
+                                     description='Import neurons from CATMAID.')
+    parser.add_argument('--server', default=env('CATMAID_SERVER'),
+                        help='CATMAID server URL [$CATMAID_SERVER]')
+    parser.add_argument('--token', default=env('CATMAID_TOKEN'),
+                        help='API token [$CATMAID_TOKEN]')
+    parser.add_argument('--project', type=int, default=int(env('CATMAID_PROJECT', 1)),
+                        help='Project ID [$CATMAID_PROJECT]')
+    parser.add_argument('--http-user', default=env('CATMAID_HTTP_USER'),
+                        help='HTTP user [$CATMAID_HTTP_USER]')
+    parser.add_argument('--http-password', default=env('CATMAID_HTTP_PASSWORD'),
+                        help='HTTP password [$CATMAID_HTTP_PASSWORD]')
+    parser.add_argument('--max-requests', type=int, default=None,
+                        help='Max number of parallel requests.')
+
+    parser.add_argument('--skids', action='append', default=[],
+                        help='Skeleton ID(s) to import, comma-separated. Can be '
+                             'given multiple times.')
+    parser.add_argument('--annotation', action='append', default=[],
+                        help='Import neurons with this annotation. Can be given '
+                             'multiple times.')
+    parser.add_argument('--name', action='append', default=[],
+                        help='Import neurons with this name. Can be given '
+                             'multiple times.')
+    parser.add_argument('--partial-match', action='store_true',
+                        help='Allow partial matches of names and annotations.')
+    parser.add_argument('--intersect', action='store_true',
+                        help='Neurons must match all names and annotations.')
+    parser.add_argument('--min-nodes', type=int, default=0,
+                        help='Ignore neurons with fewer nodes.')
+    parser.add_argument('--update-changed', action='store_true',
+                        help='Re-import neurons already in the scene (e.g. '
+                             'when re-running on the saved output) that '
+                             'changed on the server since their import.')
+    parser.add_argument('--shard', type=shard, default=None,
+                        help='Only import the i-th of n parts of the matching '
+                             'neurons, e.g. "2/8".')
+
+    parser.add_argument('--downsampling', type=int, default=2)
+    parser.add_argument('--no-synapses', action='store_true',
+                        help='Do not import synapses.')
+    parser.add_argument('--gap-junctions', action='store_true',
+                        help='Import gap junctions.')
+    parser.add_argument('--abutting', action='store_true',
+                        help='Import abutting connectors.')
+    parser.add_argument('--radii', action='store_true',
+                        help='Use node radii.')
+    parser.add_argument('--connectors-as-spheres', action='store_true')
+    parser.add_argument('--split-strahler', action='store_true',
+                        help='Split neurites by Strahler index on import.')
+
+    parser.add_argument('--output', default=None,
+                        help='Save the .blend file to this path.')
+    args = parser.parse_args(argv)
+
+    if not args.server:
+        parser.error('No server given: use --server or set $CATMAID_SERVER')
+
+    connect(args.server,
+            api_token=args.token,
+            http_user=args.http_user,
+            http_password=args.http_password,
+            project_id=args.project,
+            max_threads=args.max_requests)
+
+    start_timings('Import')
+    imported = []
+    try:
+        imported = import_neurons(skeleton_ids=[s for x in args.skids for s in split_names(x)],
+                                  names=args.name,
+                                  annotations=args.annotation,
+                                  partial_match=args.partial_match,
+                                  intersect=args.intersect,
+                                  minimum_nodes=args.min_nodes,
+                                  update_changed=args.update_changed,
+                                  shard=args.shard,
+                                  downsampling=args.downsampling,
+                                  import_synapses=not args.no_synapses,
+                                  import_gap_junctions=args.gap_junctions,
+                                  import_abutting=args.abutting,
+                                  use_radii=args.radii,
+                                  cn_as_curves=not args.connectors_as_spheres,
+                                  split_strahler=args.split_strahler)
+    except NothingToImport as e:
+        # Not an error, e.g. when re-running on the saved output and all
+        # neurons are already in the scene (and up to date with
+        # --update-changed)
+        print(f'Nothing to import: {e}')
+    finally:
+        print_timings(stop_timings())
+    print(f'Imported {len(imported)} neurons')
+
+    if args.output:
+        bpy.ops.wm.save_as_mainfile(filepath=os.path.abspath(args.output))
+
+
+STARTUP['import'] = time.perf_counter() - STARTUP.pop('import_start')
+
 
 # This allows us to run the script directly from Blender's Text editor
-# to test the add-on without having to install it.
+# to test the add-on without having to install it. Arguments after "--"
+# run a headless import instead (see `main`).
 if __name__ == "__main__":
-    register()
+    if '--' in sys.argv:
+        main(sys.argv[sys.argv.index('--') + 1:])
+    else:
+        register()
@@ -0,0 +1,134 @@
+"""End-to-end throughput benchmark for `CatmaidClient` against a mock server.
+
+Starts the mock server (see mock_server.py) in the background, then runs the
+same sequence of requests as an import in Blender - search, names, skeletons,
+processing into segments - followed by connector details and a volume.
+Creating Blender objects is not part of the benchmark.
+
+Examples
+--------
+    python benchmarks/bench_client.py --neurons 200 --latency 0.05
+    python benchmarks/bench_client.py --bandwidth 2e6 --error-rate 0.01 --output run.json
+    python benchmarks/bench_client.py --server http://localhost:8000  # stand-alone server
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.dirname(HERE))
+
+import CATMAIDImport as cm  # noqa: E402
+import mock_server  # noqa: E402
+
+
+def run(server, args):
+    """Run one pass through all stages, return {stage: stats}."""
+    client = cm.CatmaidClient(server.url if server else args.server,
+                              api_token='mock', project_id=1,
+                              max_threads=args.max_threads)
+    stats = {}
+
+    def stage(name, func):
+        if server:
+            server.reset_stats()
+        start = time.perf_counter()
+        try:
+            result = func()
+            error = None
+        except BaseException as e:
+            result, error = None, str(e)
+        elapsed = time.perf_counter() - start
+        s = {'time': elapsed}
+        if server:
+            s.update({'requests': server.n_requests,
+                      'errors': server.n_errors,
+                      'req_per_s': server.n_requests / elapsed if elapsed else 0,
+                      'mb': server.bytes_sent / 1e6})
+        if error:
+            s['failed'] = error
+        stats[name] = s
+        return result
+
+    start = time.perf_counter()
+    if args.annotation:
+        skids = stage('search', lambda: client.search_annotations([args.annotation]))
+    else:
+        skids = stage('search', lambda: client.search_size(1))
+    skids = list(skids if skids is not None else [])[:args.limit]
+
+    data = stage('download', lambda: cm.run_concurrently(
+        names=lambda: client.get_names(skids),
+        skeletons=lambda: client.get_skeletons(skids, with_abutting=True)))
+    skdata = data['skeletons'] if data else {}
+
+    stage('process', lambda: [cm.prepare_skeleton(s, downsampling=2)
+                              for s in skdata.values() if isinstance(s, list)])
+    stats['import'] = {'time': time.perf_counter() - start, 'neurons': len(skdata)}
+
+    cn_ids = [c[1] for s in skdata.values() if isinstance(s, list) for c in s[1]]
+    stage('connector details', lambda: client.get_connector_details(cn_ids, use_cache=False))
+    stage('volume', lambda: client.get_volume(client.get_volume_list()[0][0]))
+
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    mock_server.add_server_args(parser)
+    parser.add_argument('--server', default=None,
+                        help='Use an already running (mock) server at this URL '
+                             'instead of starting one. Request counts are not '
+                             'available in this case.')
+    parser.add_argument('--annotation', default=None,
+                        help='Annotation to search for, e.g. "group 0". '
+                             'Without, imports all neurons.')
+    parser.add_argument('--limit', type=int, default=None,
+                        help='Max number of neurons to import.')
+    parser.add_argument('--max-threads', type=int, default=20,
+                        help='Max parallel requests of the client.')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Number of runs (fresh client each time).')
+    parser.add_argument('--output', default=None,
+                        help='Write results to this JSON file.')
+    args = parser.parse_args(argv)
+
+    server = None
+    if not args.server:
+        server = mock_server.start_server(**mock_server.server_kwargs(args))
+        print(f'Mock server running at {server.url}')
+
+    runs = []
+    try:
+        for i in range(args.repeat):
+            stats = run(server, args)
+            runs.append(stats)
+            print(f'\nRun {i + 1}:')
+            for name, s in stats.items():
+                line = f'  {name:<20} {s["time"]:>8.3f}s'
+                if s.get('requests'):
+                    line += (f'  {s["requests"]:>6} requests  {s["req_per_s"]:>8.1f} req/s'
+                             f'  {s["mb"]:>8.2f} MB  {s["errors"]} errors')
+                if 'neurons' in s:
+                    line += f'  {s["neurons"]} neurons'
+                if 'failed' in s:
+                    line += f'  FAILED: {s["failed"][:80]}'
+                print(line)
+    finally:
+        if server:
+            server.shutdown()
+
+    best = min(r['import']['time'] for r in runs)
+    print(f'\nBest end-to-end import time: {best:.3f}s')
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'args': vars(args), 'runs': runs}, f, indent=2)
+        print(f'Results written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
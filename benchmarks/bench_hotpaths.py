@@ -0,0 +1,146 @@
+"""Benchmark the numpy-only functions of CATMAIDImport outside of Blender.
+
+Examples
+--------
+Run the default suite and write results to a file:
+
+    python benchmarks/bench_hotpaths.py --output before.json
+
+Compare against an earlier run, flagging anything >10% slower:
+
+    python benchmarks/bench_hotpaths.py --compare before.json --threshold 0.1
+
+Exits with code 1 if any benchmark regressed beyond the threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.dirname(HERE))
+
+import CATMAIDImport as cm  # noqa: E402
+import synthetic  # noqa: E402
+
+TREE_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+MESH_SIZES = (1_000, 10_000, 100_000)
+
+
+def timeit(func, repeat):
+    """Run `func` `repeat` times and return timings in seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def make_cases(tree_sizes, mesh_sizes):
+    """Yield (name, callable) for each benchmark."""
+    for n in tree_sizes:
+        node_ids, parent_ids, coords = synthetic.make_tree(n)
+        yield f'extract_long_segments[n={n}]', lambda: cm.extract_long_segments(node_ids, parent_ids)
+        yield f'extract_short_segments[n={n}]', lambda: cm.extract_short_segments(node_ids, parent_ids)
+        yield f'strahler_index[n={n}]', lambda: cm.strahler_index(node_ids, parent_ids)
+        yield f'apply_global_xforms[n={n}]', lambda: cm.apply_global_xforms(coords)
+        yield f'cluster_kmeans[n={n},k=10]', lambda: cm.cluster_kmeans(coords, 10)
+        skeleton = synthetic.make_compact_skeleton(n)
+        yield f'prepare_skeleton[n={n}]', lambda: cm.prepare_skeleton(skeleton, downsampling=2)
+
+    for n in mesh_sizes:
+        for kind in ('IndexedTriangleSet', 'IndexedFaceSet'):
+            mesh = synthetic.make_mesh(n, kind=kind)
+            yield f'parse_x3d_mesh[{kind},n={n}]', lambda: cm.parse_x3d_mesh(mesh)
+
+
+def revision():
+    """Return current git revision (if any)."""
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=HERE, text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except BaseException:
+        return None
+
+
+def compare(results, baseline, threshold):
+    """Print comparison against baseline and return names of regressions."""
+    regressions = []
+    print(f'\n{"benchmark":<50} {"before":>10} {"after":>10} {"ratio":>7}')
+    for name, res in results.items():
+        if name not in baseline:
+            continue
+        before, after = baseline[name]['min'], res['min']
+        ratio = after / before if before else float('inf')
+        flag = ''
+        if ratio > 1 + threshold:
+            flag = '  SLOWER'
+            regressions.append(name)
+        elif ratio < 1 / (1 + threshold):
+            flag = '  faster'
+        print(f'{name:<50} {before:>9.4f}s {after:>9.4f}s {ratio:>6.2f}x{flag}')
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--tree-sizes', type=int, nargs='+', default=TREE_SIZES,
+                        help='Number of nodes of synthetic neurons.')
+    parser.add_argument('--mesh-sizes', type=int, nargs='+', default=MESH_SIZES,
+                        help='(Approximate) number of vertices of synthetic meshes.')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Number of runs per benchmark (the fastest counts).')
+    parser.add_argument('--filter', default=None,
+                        help='Only run benchmarks containing this string.')
+    parser.add_argument('--output', default=None,
+                        help='Write results to this JSON file.')
+    parser.add_argument('--compare', default=None,
+                        help='JSON file with results of an earlier run.')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='Relative slowdown that counts as a regression.')
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name, func in make_cases(args.tree_sizes, args.mesh_sizes):
+        if args.filter and args.filter not in name:
+            continue
+        times = timeit(func, args.repeat)
+        results[name] = {'min': min(times),
+                         'median': float(np.median(times)),
+                         'repeat': args.repeat}
+        print(f'{name:<50} {min(times):>9.4f}s')
+
+    out = {'meta': {'revision': revision(),
+                    'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                    'python': platform.python_version(),
+                    'numpy': np.__version__,
+                    'platform': platform.platform()},
+           'results': results}
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(out, f, indent=2)
+        print(f'Results written to {args.output}')
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline['results'], args.threshold)
+        if regressions:
+            print(f'\n{len(regressions)} benchmark(s) slower by more than '
+                  f'{args.threshold:.0%}')
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,364 @@
+"""Local stand-in for a CATMAID server serving synthetic data.
+
+Implements just the endpoints used by the plugin's `CatmaidClient`:
+
+- ``{pid}/skeletons/{skid}/compact-detail``
+- ``{pid}/skeletons/summary``
+- ``{pid}/skeletons/`` and ``{pid}/skeletons?nodecount_gt=...``
+- ``{pid}/skeleton/neuronnames``
+- ``{pid}/skeleton/annotationlist``
+- ``{pid}/skeletons/review-status``
+- ``{pid}/annotations/`` and ``{pid}/annotations/query-targets``
+- ``{pid}/connectors/`` (abutting connectors)
+- ``{pid}/connector/skeletons``
+- ``{pid}/volumes/`` and ``{pid}/volumes/{id}``
+
+Latency, bandwidth and errors can be injected to approximate a remote
+server. Run stand-alone with e.g.:
+
+    python benchmarks/mock_server.py --port 8000 --latency 0.05 --bandwidth 5e6
+
+or start from Python via `start_server()`.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qsl
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import synthetic  # noqa: E402
+
+
+class Fixtures:
+    """Synthetic project: neurons, annotations and volumes.
+
+    Skeletons are generated on first request and then kept (pre-encoded)
+    in memory. All skeletons count as last edited when the fixtures were
+    created.
+
+    Parameters
+    ----------
+    n_neurons :     int
+                    Number of neurons in the project.
+    n_nodes :       int
+                    Number of nodes per neuron.
+    n_annotations : int
+                    Neurons are split evenly across this many annotations
+                    named "group {i}".
+    n_volumes :     int
+                    Number of volumes.
+    seed :          int
+
+    """
+
+    def __init__(self, n_neurons=100, n_nodes=5_000, n_annotations=10,
+                 n_volumes=3, seed=0):
+        self.n_nodes = n_nodes
+        self.seed = seed
+        self.skids = list(range(1000, 1000 + n_neurons))
+        self.annotations = [{'id': i + 1, 'name': f'group {i}'}
+                            for i in range(n_annotations)]
+        self.n_volumes = n_volumes
+        self._skeletons = {}
+        self._meshes = {}
+        self._lock = threading.Lock()
+        self.edition_time = time.time()
+
+    def name(self, skid):
+        return f'neuron {skid}'
+
+    def annotation_ids(self, skid):
+        return [self.annotations[skid % len(self.annotations)]['id']] if self.annotations else []
+
+    def node_count(self, skid):
+        return self.n_nodes
+
+    def compact_detail(self, skid):
+        """Return encoded compact-detail response for given skeleton."""
+        with self._lock:
+            if skid not in self._skeletons:
+                data = synthetic.make_compact_skeleton(self.n_nodes, seed=skid)
+                self._skeletons[skid] = json.dumps(data).encode()
+            return self._skeletons[skid]
+
+    def connector_details(self, cn_id):
+        """Partners of a connector (connector IDs encode the skeleton ID)."""
+        skid = (cn_id - 10**9) // 10**6
+        rng = random.Random(cn_id)
+        # Which side this neuron is on is random - that's fine for benchmarks
+        if rng.random() < 0.5:
+            pre, post = skid, rng.sample(self.skids, min(2, len(self.skids)))
+        else:
+            pre, post = rng.choice(self.skids), [skid]
+        return {'presynaptic_to': pre,
+                'postsynaptic_to': post,
+                'presynaptic_to_node': rng.randrange(10**6),
+                'postsynaptic_to_node': [rng.randrange(10**6) for _ in post]}
+
+    def mesh(self, volume_id):
+        with self._lock:
+            if volume_id not in self._meshes:
+                self._meshes[volume_id] = synthetic.make_mesh(10_000, seed=volume_id)
+            return self._meshes[volume_id]
+
+
+def _ids(params, key):
+    """Extract e.g. `skids[0]`, `skids[1]`, ... from request parameters."""
+    pattern = re.compile(re.escape(key) + r'\[\d+\]')
+    return [v for k, v in params if pattern.fullmatch(k)]
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    """Request handler - configured via attributes of the server."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self._handle(None)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self._handle(self.rfile.read(length).decode())
+
+    def _handle(self, body):
+        server = self.server
+        with server.stats_lock:
+            server.n_requests += 1
+
+        if server.latency:
+            time.sleep(max(0, random.gauss(server.latency, server.jitter)))
+
+        if server.error_rate and random.random() < server.error_rate:
+            with server.stats_lock:
+                server.n_errors += 1
+            return self._send(500, {'error': 'Injected error', 'detail': ''})
+
+        url = urlparse(self.path)
+        params = parse_qsl(url.query) + (parse_qsl(body) if body else [])
+        try:
+            status, response = self.route(url.path, dict(params), params)
+        except BaseException as e:
+            status, response = 500, {'error': str(e), 'detail': repr(e)}
+        self._send(status, response)
+
+    def route(self, path, p, params):
+        """Return (status, response) for given path and parameters."""
+        fx = self.server.fixtures
+        path = re.sub(r'^/\d+/', '/', path.rstrip('/') + '/')
+
+        m = re.fullmatch(r'/skeletons/(\d+)/compact-detail/', path)
+        if m:
+            skid = int(m.group(1))
+            if skid not in fx.skids:
+                return 404, {'error': f'Skeleton {skid} not found'}
+            return 200, fx.compact_detail(skid)
+
+        if path == '/skeletons/':
+            min_size = int(p.get('nodecount_gt', -1)) + 1
+            return 200, [s for s in fx.skids if fx.node_count(s) >= min_size]
+
+        if path == '/skeleton/neuronnames/':
+            return 200, {s: fx.name(int(s)) for s in _ids(params, 'skids')}
+
+        if path == '/skeletons/review-status/':
+            return 200, {s: [fx.node_count(int(s)), 0] for s in _ids(params, 'skeleton_ids')}
+
+        if path == '/skeletons/summary/':
+            return 200, [{'skeleton_id': int(s), 'num_nodes': fx.node_count(int(s)),
+                          'last_edition_time': fx.edition_time}
+                         for s in _ids(params, 'skeleton_ids') if int(s) in fx.skids]
+
+        if path == '/skeleton/annotationlist/':
+            skids = _ids(params, 'skeleton_ids')
+            return 200, {'skeletons': {s: {'annotations': [{'id': a, 'uid': 1}
+                                                           for a in fx.annotation_ids(int(s))]}
+                                       for s in skids},
+                         'annotations': {str(a['id']): a['name'] for a in fx.annotations}}
+
+        if path == '/annotations/':
+            return 200, {'annotations': fx.annotations}
+
+        if path == '/annotations/query-targets/':
+            return 200, self.query_targets(p, params)
+
+        if path == '/connectors/':
+            # Abutting connectors: none in our synthetic data
+            return 200, {'links': [], 'tags': {}}
+
+        if path == '/connector/skeletons/':
+            return 200, [[int(c), fx.connector_details(int(c))]
+                         for c in _ids(params, 'connector_ids')]
+
+        if path == '/volumes/':
+            return 200, {'columns': ['id', 'name'],
+                         'data': [[i, f'volume {i}', '', 1, 1, 1, '', '', [], 0, 0, True, True]
+                                  for i in range(1, fx.n_volumes + 1)]}
+
+        m = re.fullmatch(r'/volumes/(\d+)/', path)
+        if m:
+            vid = int(m.group(1))
+            return 200, {'id': vid, 'name': f'volume {vid}', 'mesh': fx.mesh(vid)}
+
+        if path == '/':
+            return 200, {}
+
+        return 404, {'error': f'Unknown endpoint {path}'}
+
+    def query_targets(self, p, params):
+        fx = self.server.fixtures
+        annotated_with = {int(a) for a in _ids(params, 'annotated_with')}
+        name = p.get('name')
+
+        entities = []
+        for s in fx.skids:
+            if name is not None and name.lower() not in fx.name(s).lower():
+                continue
+            if annotated_with and not annotated_with <= set(fx.annotation_ids(s)):
+                continue
+            entities.append({'id': s, 'type': 'neuron', 'name': fx.name(s),
+                             'skeleton_ids': [s]})
+
+        start = int(p.get('range_start', 0))
+        length = int(p.get('range_length', len(entities)))
+        return {'entities': entities[start:start + length],
+                'totalRecords': len(entities)}
+
+    def _send(self, status, response):
+        if not isinstance(response, bytes):
+            response = json.dumps(response).encode()
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(response)))
+        self.end_headers()
+
+        with self.server.stats_lock:
+            self.server.bytes_sent += len(response)
+
+        bandwidth = self.server.bandwidth
+        if not bandwidth:
+            self.wfile.write(response)
+            return
+
+        # Throttle by sending in chunks
+        chunk_size = 64 * 1024
+        for i in range(0, len(response), chunk_size):
+            chunk = response[i:i + chunk_size]
+            self.wfile.write(chunk)
+            time.sleep(len(chunk) / bandwidth)
+
+
+class MockServer(ThreadingHTTPServer):
+    """Threading HTTP server with fixtures and fault injection.
+
+    Parameters
+    ----------
+    address :       (host, port)
+                    Use port 0 to pick a free port.
+    fixtures :      Fixtures
+    latency :       float
+                    Mean delay (seconds) before answering each request.
+    jitter :        float
+                    Standard deviation of the delay.
+    bandwidth :     float
+                    Bytes per second per response. 0 = unlimited.
+    error_rate :    float
+                    Fraction of requests answered with a 500 error.
+
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, fixtures=None, latency=0, jitter=0,
+                 bandwidth=0, error_rate=0):
+        super().__init__(address, MockHandler)
+        self.fixtures = fixtures if fixtures else Fixtures()
+        self.latency = latency
+        self.jitter = jitter
+        self.bandwidth = bandwidth
+        self.error_rate = error_rate
+        self.stats_lock = threading.Lock()
+        self.reset_stats()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def reset_stats(self):
+        with self.stats_lock:
+            self.n_requests = 0
+            self.n_errors = 0
+            self.bytes_sent = 0
+
+
+def start_server(host='127.0.0.1', port=0, **kwargs):
+    """Start mock server in a background thread and return it.
+
+    Call ``server.shutdown()`` to stop it again.
+    """
+    server = MockServer((host, port), **kwargs)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def add_server_args(parser):
+    """Add arguments configuring the mock server to an ArgumentParser."""
+    parser.add_argument('--neurons', type=int, default=100,
+                        help='Number of neurons in the project.')
+    parser.add_argument('--nodes', type=int, default=5_000,
+                        help='Number of nodes per neuron.')
+    parser.add_argument('--annotations', type=int, default=10,
+                        help='Number of annotations.')
+    parser.add_argument('--latency', type=float, default=0,
+                        help='Mean delay per request in seconds.')
+    parser.add_argument('--jitter', type=float, default=0,
+                        help='Standard deviation of the delay in seconds.')
+    parser.add_argument('--bandwidth', type=float, default=0,
+                        help='Bytes per second per response (0 = unlimited).')
+    parser.add_argument('--error-rate', type=float, default=0,
+                        help='Fraction of requests that fail with a 500 error.')
+
+
+def server_kwargs(args):
+    """Turn parsed arguments into keyword arguments for `start_server`."""
+    return dict(fixtures=Fixtures(n_neurons=args.neurons,
+                                  n_nodes=args.nodes,
+                                  n_annotations=args.annotations),
+                latency=args.latency,
+                jitter=args.jitter,
+                bandwidth=args.bandwidth,
+                error_rate=args.error_rate)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    add_server_args(parser)
+    args = parser.parse_args(argv)
+
+    server = MockServer((args.host, args.port), **server_kwargs(args))
+    print(f'Serving {args.neurons} neurons at {server.url} (Ctrl-C to stop)')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
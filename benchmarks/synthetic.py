@@ -0,0 +1,88 @@
+"""Generators for synthetic neurons and meshes."""
+import numpy as np
+
+
+def make_tree(n_nodes, branch_prob=0.02, seed=0):
+    """Generate a random neuron-like tree.
+
+    Most nodes continue the previous node's segment; with probability
+    `branch_prob` a node instead starts a new branch off a random earlier
+    node. This gives long unbranched segments like in real neurons.
+
+    Returns
+    -------
+    node_ids :      (N, ) int array
+    parent_ids :    (N, ) int array
+                    Root has parent -1.
+    coords :        (N, 3) float32 array
+
+    """
+    rng = np.random.default_rng(seed)
+
+    ix = np.arange(n_nodes)
+    parents = ix - 1
+    branches = np.flatnonzero(rng.random(n_nodes) < branch_prob)
+    branches = branches[branches > 1]
+    parents[branches] = (rng.random(len(branches)) * branches).astype(int)
+
+    # Random, non-consecutive IDs like on a CATMAID server
+    node_ids = rng.choice(n_nodes * 20, n_nodes, replace=False) + 1
+    parent_ids = np.where(parents >= 0, node_ids[parents], -1)
+
+    # Random walk for coordinates (parents always come before their children)
+    steps = rng.normal(0, 100, (n_nodes, 3)).tolist()
+    coords = [[0., 0., 0.]]
+    for i in range(1, n_nodes):
+        p, s = coords[parents[i]], steps[i]
+        coords.append([p[0] + s[0], p[1] + s[1], p[2] + s[2]])
+    coords = np.array(coords)
+
+    return node_ids, parent_ids, coords.astype('float32')
+
+
+def make_compact_skeleton(n_nodes, n_connectors=None, seed=0):
+    """Generate compact-detail response for a synthetic neuron."""
+    rng = np.random.default_rng(seed)
+    node_ids, parent_ids, coords = make_tree(n_nodes, seed=seed)
+
+    if n_connectors is None:
+        n_connectors = n_nodes // 20
+
+    nodes = [[int(n), int(p) if p >= 0 else None, 1, *co.tolist(), -1, 5]
+             for n, p, co in zip(node_ids, parent_ids, coords)]
+
+    cn_ix = rng.integers(0, n_nodes, n_connectors)
+    cn_nodes, cn_coords = node_ids[cn_ix], coords[cn_ix]
+    connectors = [[int(n), 10**9 + seed * 10**6 + i, int(rng.integers(0, 2)),
+                   *(co + rng.normal(0, 50, 3)).tolist()]
+                  for i, (n, co) in enumerate(zip(cn_nodes, cn_coords))]
+
+    tags = {'soma': [int(node_ids[0])]}
+
+    return [nodes, connectors, tags]
+
+
+def make_mesh(n_vertices, kind='IndexedTriangleSet', seed=0):
+    """Generate X3D string for a synthetic mesh (a noisy grid)."""
+    rng = np.random.default_rng(seed)
+    k = max(2, int(np.sqrt(n_vertices)))
+
+    x, y = np.meshgrid(np.arange(k), np.arange(k))
+    z = rng.normal(0, 0.1, x.shape)
+    verts = np.c_[x.ravel(), y.ravel(), z.ravel()] * 1000
+
+    # Two triangles per grid cell
+    v = np.arange(k * k).reshape(k, k)
+    a, b, c, d = v[:-1, :-1].ravel(), v[:-1, 1:].ravel(), v[1:, :-1].ravel(), v[1:, 1:].ravel()
+    faces = np.r_[np.c_[a, b, c], np.c_[b, d, c]]
+
+    points = ' '.join(f'{co:.3f}' for co in verts.ravel())
+    if kind == 'IndexedTriangleSet':
+        index = ' '.join(map(str, faces.ravel()))
+        return (f"<IndexedTriangleSet index='{index}'>"
+                f"<Coordinate point='{points}'/></IndexedTriangleSet>")
+    elif kind == 'IndexedFaceSet':
+        index = ' '.join(' '.join(map(str, f)) + ' -1' for f in faces)
+        return (f"<IndexedFaceSet coordIndex='{index}'>"
+                f"<Coordinate point='{points}'/></IndexedFaceSet>")
+    raise ValueError(f'Unknown mesh type "{kind}"')